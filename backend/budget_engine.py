@@ -22,12 +22,12 @@ from calendar import monthrange
 from datetime import date, datetime, time, timedelta
 from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import and_
+from sqlalchemy import and_, func
 from sqlalchemy.orm import Session
 
-from backend.helpers import get_base_currency, get_latest_rates, get_rates_bulk
+from backend.helpers import get_base_currency, get_latest_rates, get_rates_bulk, get_transfer_location_ids
 from backend.models import (
-    Account, BudgetItem, BudgetMonthLine, Category, CategoryBucket, Loan, Location,
+    Account, BudgetItem, BudgetMonthLine, Category, CategoryBucket, Loan,
     Payee, Transaction,
 )
 
@@ -301,7 +301,7 @@ def ensure_month(db: Session, ym: str) -> None:
     elif ym == cur:
         generate_month(db, ym, skip_existing=True)
     else:
-        seen = db.query(BudgetMonthLine).filter(BudgetMonthLine.year_month == ym).count()
+        seen = db.query(func.count(BudgetMonthLine.id)).filter(BudgetMonthLine.year_month == ym).scalar()
         if seen == 0:
             generate_month(db, ym, skip_existing=False)
         db.query(BudgetMonthLine).filter(
@@ -511,13 +511,6 @@ def _loads(raw) -> List[int]:
         return []
 
 
-def _transfer_location_ids(db: Session) -> List[int]:
-    return [
-        row[0] for row in
-        db.query(Location.id).filter(Location.name.in_(["Transfer In", "Transfer Out"])).all()
-    ]
-
-
 def normalise_name(name: Optional[str]) -> str:
     """
     Key a category name for matching. Subcategories point at their parent by
@@ -580,7 +573,7 @@ def month_snapshot(db: Session, ym: str) -> Dict:
     ensure_month(db, ym)
 
     lines = db.query(BudgetMonthLine).filter(BudgetMonthLine.year_month == ym).all()
-    transfer_ids = _transfer_location_ids(db)
+    transfer_ids = get_transfer_location_ids(db)
     latest_rates = get_latest_rates(db)
 
     def to_base(amount: float, currency: str, rates: Dict[str, float]) -> float:
@@ -1139,7 +1132,7 @@ def suggest_candidates(db: Session, kind: str = "fixed", min_occurrences: int =
             BudgetItem.set_aside_account_id.isnot(None)).all()
     }
 
-    transfer_ids = _transfer_location_ids(db)
+    transfer_ids = get_transfer_location_ids(db)
     transactions = db.query(Transaction).filter(
         Transaction.date >= datetime.combine(cutoff, time.min)
     ).all()
@@ -8,6 +8,7 @@ and protected routes are refused. This is what makes the at-rest encryption real
 — without the password (which unwraps the DEK) the file cannot be opened.
 """
 from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 DB_PATH = "./data/finance.db"
@@ -20,6 +21,10 @@ engine = None
 SessionLocal = None
 _dek_hex = None
 
+# Whether the open database has the full-text transaction search index (see
+# ensure_search_index); the search falls back to LIKE when it does not.
+search_index = False
+
 
 def is_unlocked() -> bool:
     return engine is not None
@@ -78,10 +83,20 @@ _ADDED_COLUMNS = {
 # Indexes on tables that already existed. ``create_all`` skips a table it finds,
 # indexes included, so an index added later has to be created explicitly.
 _ADDED_INDEXES = (
+    # The filters behind the transaction list and the transfer views.
+    ("transactions", "CREATE INDEX IF NOT EXISTS idx_transaction_account_date "
+                     "ON transactions (account_id, date)"),
+    ("transactions", "CREATE INDEX IF NOT EXISTS idx_transaction_category_date "
+                     "ON transactions (category_id, date)"),
+    ("transactions", "CREATE INDEX IF NOT EXISTS idx_transaction_location_date "
+                     "ON transactions (location_id, date)"),
     ("transactions", "CREATE INDEX IF NOT EXISTS ix_transactions_split_group_id "
                      "ON transactions (split_group_id)"),
     ("transactions", "CREATE INDEX IF NOT EXISTS idx_transaction_split_group "
                      "ON transactions (split_group_id, id)"),
+    # Duplicate checks during import.
+    ("transactions", "CREATE INDEX IF NOT EXISTS idx_transaction_account_date_amount "
+                     "ON transactions (account_id, date, amount)"),
 )
 
 # Run after the columns exist, to give the new ones a sensible value on rows that
@@ -113,6 +128,51 @@ def _ensure_columns(eng) -> None:
         c.commit()
 
 
+# Full-text index behind the transaction search: each transaction's note and
+# payee name, split into trigrams so any substring of three or more characters
+# is found through the index instead of a LIKE scan of every row. Triggers keep
+# it in step with every write, bulk and raw SQL included.
+_SEARCH_TABLE = ("CREATE VIRTUAL TABLE transaction_search "
+                 "USING fts5(note, payee_name, tokenize='trigram')")
+_SEARCH_BACKFILL = ("INSERT INTO transaction_search (rowid, note, payee_name) "
+                    "SELECT t.id, t.note, p.name FROM transactions t "
+                    "LEFT JOIN payees p ON p.id = t.payee_id")
+_SEARCH_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS transaction_search_insert AFTER INSERT ON transactions BEGIN "
+    "INSERT INTO transaction_search (rowid, note, payee_name) "
+    "VALUES (new.id, new.note, (SELECT name FROM payees WHERE id = new.payee_id)); END",
+    "CREATE TRIGGER IF NOT EXISTS transaction_search_update "
+    "AFTER UPDATE OF note, payee_id ON transactions BEGIN "
+    "UPDATE transaction_search SET note = new.note, "
+    "payee_name = (SELECT name FROM payees WHERE id = new.payee_id) WHERE rowid = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS transaction_search_delete AFTER DELETE ON transactions BEGIN "
+    "DELETE FROM transaction_search WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS transaction_search_payee AFTER UPDATE OF name ON payees BEGIN "
+    "UPDATE transaction_search SET payee_name = new.name "
+    "WHERE rowid IN (SELECT id FROM transactions WHERE payee_id = new.id); END",
+)
+
+
+def ensure_search_index(eng) -> None:
+    """Create (and fill) the search index if the database lacks it. Leaves
+    ``search_index`` False when this SQLite build has no FTS5 trigram support."""
+    global search_index
+    with eng.connect() as c:
+        if not c.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = 'transaction_search'"
+        ).first():
+            try:
+                c.exec_driver_sql(_SEARCH_TABLE)
+            except OperationalError:
+                search_index = False
+                return
+            c.exec_driver_sql(_SEARCH_BACKFILL)
+        for sql in _SEARCH_TRIGGERS:
+            c.exec_driver_sql(sql)
+        c.commit()
+    search_index = True
+
+
 def unlock(dek_hex: str) -> None:
     """Open the encrypted DB with the given key and ensure the schema exists.
     Raises if the key cannot open the file. No-op if already unlocked."""
@@ -125,6 +185,18 @@ def unlock(dek_hex: str) -> None:
         f"sqlite:///{DB_PATH}",
         module=sqlcipher,
         connect_args={"check_same_thread": False},
+        # Every new connection has to be keyed and starts with a cold page
+        # cache, so hand back the most recently used (warmest) one first. The
+        # pool keeps QueuePool's default size: each connection can grow a
+        # 64 MB page cache (PRAGMA cache_size) and SQLite serialises writers
+        # anyway, so holding one per threadpool worker would cost memory for
+        # no throughput. A local file never drops a connection, so no
+        # pre-ping or recycling is needed.
+        pool_use_lifo=True,
+        # Room in the compiled-SQL cache for every distinct statement the
+        # endpoints build (the default 500 is shared with the ORM's own
+        # internal statements), so none is evicted and recompiled per request.
+        query_cache_size=1200,
     )
     event.listen(eng, "connect", lambda conn, rec: _apply_pragmas(conn))
     try:
@@ -138,18 +210,20 @@ def unlock(dek_hex: str) -> None:
     # First open of a brand-new DB file creates an empty encrypted DB; build tables.
     Base.metadata.create_all(bind=eng)
     _ensure_columns(eng)
+    ensure_search_index(eng)
     engine = eng
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=eng)
 
 
 def lock() -> None:
     """Close the DB and forget the key (app becomes locked again)."""
-    global engine, SessionLocal, _dek_hex
+    global engine, SessionLocal, _dek_hex, search_index
     if engine is not None:
         engine.dispose()
     engine = None
     SessionLocal = None
     _dek_hex = None
+    search_index = False
 
 
 def get_db():
@@ -2,37 +2,69 @@
 Helper functions for balance calculations and exchange rates.
 Consolidates balance_calculator.py and exchange_rate_helpers.py.
 """
-from datetime import date, datetime, timedelta
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+import secrets
+import threading
+from itertools import chain, count
+from typing import Dict, FrozenSet, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from backend.models import Transaction, Account, ExchangeRate
+from sqlalchemy import Integer, event, func, and_, case, cast, inspect, lambda_stmt, select, true, update
+from backend.models import Transaction, Account, ExchangeRate, Location, Payee
 
 
 # =============================================================================
 # EXCHANGE RATE FUNCTIONS
 # =============================================================================
 
+# Latest rates, which every balance recalculation starts with. Keyed on a cheap
+# fingerprint of the table, checked on every call, so a new rate is picked up
+# straight away while an unchanged table skips the GROUP BY. The engine is part
+# of the key too, as each profile is a separate database whose ids can coincide.
+_latest_rates_cache: dict = {"key": None, "rates": None}
+
+
 def get_latest_rates(db: Session) -> Dict[str, float]:
     """
     Get the most recent exchange rate for each currency.
     Returns dictionary with currency codes as keys and rates as values.
     GBP is always 1.0 (base currency).
     """
+    # The updater appends rows and re-stamps created_at on any it rewrites.
+    key = (db.get_bind(), *db.query(func.max(ExchangeRate.id), func.max(ExchangeRate.created_at)).one())
+    if _latest_rates_cache["key"] == key:
+        return dict(_latest_rates_cache["rates"])
+
     subquery = db.query(
         ExchangeRate.currency,
         func.max(ExchangeRate.date).label('max_date')
     ).group_by(ExchangeRate.currency).subquery()
     
-    rates_query = db.query(ExchangeRate).join(
-        subquery,
-        (ExchangeRate.currency == subquery.c.currency) &
-        (ExchangeRate.date == subquery.c.max_date)
-    ).all()
-    
-    rates_dict = {rate.currency: rate.rate for rate in rates_query}
+    rates_dict = dict(db.execute(
+        select(ExchangeRate.currency, ExchangeRate.rate).join(
+            subquery,
+            (ExchangeRate.currency == subquery.c.currency) &
+            (ExchangeRate.date == subquery.c.max_date)
+        )
+    ).all())
     rates_dict['GBP'] = 1.0
-    return rates_dict
+    _latest_rates_cache.update(key=key, rates=rates_dict)
+    return dict(rates_dict)
+
+
+def _on_day(day: date):
+    """
+    Match rates stamped on the given day. A range on the raw column rather than
+    wrapping it in DATE(), so lookups can seek on the (currency, date) index.
+    """
+    start = datetime.combine(day, time.min)
+    return and_(ExchangeRate.date >= start, ExchangeRate.date < start + timedelta(days=1))
+
+
+def _in_week_to(day: date):
+    """Match rates stamped on the given day or any of the seven before it."""
+    end = datetime.combine(day, time.min) + timedelta(days=1)
+    return and_(ExchangeRate.date >= end - timedelta(days=8), ExchangeRate.date < end)
 
 
 def get_rate_for_date(db: Session, currency: str, target_date: date) -> Optional[float]:
@@ -46,26 +78,11 @@ def get_rate_for_date(db: Session, currency: str, target_date: date) -> Optional
     if isinstance(target_date, datetime):
         target_date = target_date.date()
     
-    # Try exact date first
-    rate = db.query(ExchangeRate).filter(
+    # The exact date if present, otherwise the closest earlier one within a week
+    return db.query(ExchangeRate.rate).filter(
         ExchangeRate.currency == currency,
-        func.date(ExchangeRate.date) == target_date
-    ).first()
-    
-    if rate:
-        return rate.rate
-    
-    # Look backward up to 7 days
-    for days_back in range(1, 8):
-        check_date = target_date - timedelta(days=days_back)
-        rate = db.query(ExchangeRate).filter(
-            ExchangeRate.currency == currency,
-            func.date(ExchangeRate.date) == check_date
-        ).first()
-        if rate:
-            return rate.rate
-    
-    return None
+        _in_week_to(target_date)
+    ).order_by(ExchangeRate.date.desc()).limit(1).scalar()
 
 
 def get_rates_for_date(db: Session, target_date: date) -> Dict[str, float]:
@@ -73,22 +90,13 @@ def get_rates_for_date(db: Session, target_date: date) -> Dict[str, float]:
     if isinstance(target_date, datetime):
         target_date = target_date.date()
     
-    rates = db.query(ExchangeRate).filter(
-        func.date(ExchangeRate.date) == target_date
-    ).all()
-    
-    rates_dict = {rate.currency: rate.rate for rate in rates}
-    
-    # If no rates found, look backward up to 7 days
-    if not rates_dict:
-        for days_back in range(1, 8):
-            check_date = target_date - timedelta(days=days_back)
-            rates = db.query(ExchangeRate).filter(
-                func.date(ExchangeRate.date) == check_date
-            ).all()
-            if rates:
-                rates_dict = {rate.currency: rate.rate for rate in rates}
-                break
+    # Rates from the exact date, or from the closest earlier date within a week
+    latest = db.query(func.max(ExchangeRate.date)).filter(_in_week_to(target_date)).scalar()
+    rates_dict = {}
+    if latest:
+        rates_dict = dict(db.execute(
+            select(ExchangeRate.currency, ExchangeRate.rate).where(_on_day(latest.date()))
+        ).all())
     
     rates_dict['GBP'] = 1.0
     return rates_dict
@@ -98,43 +106,42 @@ def get_rates_bulk(db: Session, currencies: list, date_from: date, date_to: date
     """
     Get exchange rates for multiple currencies across a date range.
     More efficient than calling get_rates_for_date multiple times.
-    Returns nested dictionary: {date: {currency: rate}}
+    Returns nested dictionary: {date: {currency: rate}}. Consecutive days with
+    the same rates share one inner dict, so treat them as read-only.
     """
     if isinstance(date_from, datetime):
         date_from = date_from.date()
     if isinstance(date_to, datetime):
         date_to = date_to.date()
     
-    rates = db.query(ExchangeRate).filter(
-        and_(
+    rates = db.execute(
+        select(ExchangeRate.date, ExchangeRate.currency, ExchangeRate.rate).where(
             ExchangeRate.currency.in_(currencies),
-            func.date(ExchangeRate.date) >= date_from,
-            func.date(ExchangeRate.date) <= date_to
-        )
-    ).order_by(ExchangeRate.date).all()
+            ExchangeRate.date >= datetime.combine(date_from, time.min),
+            ExchangeRate.date < datetime.combine(date_to + timedelta(days=1), time.min)
+        ).order_by(ExchangeRate.date)
+    )
     
     # Organise by date
     rates_by_date = {}
-    for rate in rates:
-        rate_date = rate.date.date() if isinstance(rate.date, datetime) else rate.date
+    for rate_date, currency, rate in rates:
+        if isinstance(rate_date, datetime):
+            rate_date = rate_date.date()
         if rate_date not in rates_by_date:
             rates_by_date[rate_date] = {'GBP': 1.0}
-        rates_by_date[rate_date][rate.currency] = rate.rate
-    
-    # Fill missing dates using previous rate (carry forward)
-    all_dates = []
-    current_date = date_from
-    while current_date <= date_to:
-        all_dates.append(current_date)
-        current_date += timedelta(days=1)
+        rates_by_date[rate_date][currency] = rate
     
+    # Fill missing dates using previous rate (carry forward). A day without new
+    # rates shares the previous day's dict instead of copying it, so only days
+    # that actually changed allocate one.
     complete_rates = {}
     last_rates = {'GBP': 1.0}
-    
-    for current_date in all_dates:
+    current_date = date_from
+    while current_date <= date_to:
         if current_date in rates_by_date:
-            last_rates.update(rates_by_date[current_date])
-        complete_rates[current_date] = last_rates.copy()
+            last_rates = {**last_rates, **rates_by_date[current_date]}
+        complete_rates[current_date] = last_rates
+        current_date += timedelta(days=1)
     
     return complete_rates
 
@@ -152,6 +159,182 @@ def convert_amount(amount: float, from_currency: str, to_currency: str,
     return amount_in_gbp * rate_to
 
 
+# =============================================================================
+# TRANSFER LOCATIONS
+# =============================================================================
+
+TRANSFER_LOCATIONS = ("Transfer In", "Transfer Out")
+
+# Transfers are the two rows carrying these locations. Nearly every report
+# excludes them, so their ids are cached per database and dropped whenever a
+# location is written: by a flush, or by an INSERT, UPDATE or DELETE statement
+# run through the session (the location endpoints write with RETURNING, so a
+# create or rename never flushes).
+_transfer_locations_cache: dict = {"bind": None, "ids": None, "by_name": None}
+
+
+def get_transfer_locations(db: Session) -> Dict[str, int]:
+    """Transfer location ids by name; a location not created yet is absent."""
+    bind = db.get_bind()
+    if _transfer_locations_cache["ids"] is None or _transfer_locations_cache["bind"] is not bind:
+        by_name = dict(db.execute(
+            select(Location.name, Location.id).where(Location.name.in_(TRANSFER_LOCATIONS))
+        ).all())
+        _transfer_locations_cache.update(bind=bind, ids=frozenset(by_name.values()), by_name=by_name)
+    return dict(_transfer_locations_cache["by_name"])
+
+
+def get_transfer_location_ids(db: Session) -> FrozenSet[int]:
+    """IDs of the Transfer In / Transfer Out locations (empty if neither exists yet)."""
+    get_transfer_locations(db)
+    return _transfer_locations_cache["ids"]
+
+
+def ensure_transfer_locations(db: Session) -> Tuple[int, int]:
+    """
+    IDs of (Transfer In, Transfer Out), creating whichever is missing. Once both
+    exist this is answered from the cache without touching the database.
+    """
+    by_name = get_transfer_locations(db)
+    for name in TRANSFER_LOCATIONS:
+        if name in by_name:
+            continue
+        # The cache may predate a location this session has flushed but not
+        # committed, so look before creating one.
+        location = db.query(Location).filter(Location.name == name).first()
+        if not location:
+            location = Location(name=name)
+            db.add(location)
+            db.flush()
+        else:
+            # by_name is a copy: drop the shared cache too, or it stays
+            # without this location
+            _transfer_locations_cache.update(ids=None, by_name=None)
+        by_name[name] = location.id
+    return by_name["Transfer In"], by_name["Transfer Out"]
+
+
+@event.listens_for(Session, "after_flush")
+def _forget_transfer_locations_on_flush(session, flush_context):
+    if any(isinstance(obj, Location) for obj in chain(session.new, session.dirty, session.deleted)):
+        _transfer_locations_cache.update(ids=None, by_name=None)
+        # A concurrent request may re-cache the committed ids before this
+        # transaction commits, so forget them again once it has.
+        session.info["locations_written"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _forget_transfer_locations_on_bulk_write(orm_execute_state):
+    if (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete) and \
+            orm_execute_state.statement.table.name == Location.__tablename__:
+        _transfer_locations_cache.update(ids=None, by_name=None)
+        orm_execute_state.session.info["locations_written"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_transfer_locations_on_commit(session):
+    if session.info.pop("locations_written", False):
+        _transfer_locations_cache.update(ids=None, by_name=None)
+
+
+# =============================================================================
+# LOOKUP LISTS
+# =============================================================================
+
+# The lists behind the pickers (accounts, categories, payees, locations,
+# projects) are read on every page load but rarely change. Each is cached per
+# database with the tables it was built from, and dropped as soon as one of
+# those tables is written through the session. Every build gets its own ETag,
+# so a client holding the same version can be answered with 304 Not Modified.
+# ``kin`` holds the keys cached with ``keep``, oldest first, by ``key[0]``.
+_lookup_cache: dict = {"bind": None, "entries": {}, "kin": {}}
+
+# Bumped for a table each time its entries are dropped. A build notes the
+# counts of its tables before it runs and is only kept if none has moved since:
+# otherwise it may have read what another session has since committed over.
+_lookup_generations: Dict[str, int] = {}
+
+# Requests run on FastAPI's threadpool, so both of the above are only touched
+# while holding this. Builds run outside it.
+_lookup_lock = threading.Lock()
+
+# Per process, so a tag handed out before a restart never matches a new build.
+_LOOKUP_EPOCH = secrets.token_hex(4)
+_lookup_builds = count(1)
+
+
+def cached_lookup(db: Session, key, tables: Tuple[str, ...], build, keep: Optional[int] = None):
+    """
+    Return ``(build(), etag)``, reusing the last result for ``key`` until one of
+    ``tables`` is written. The result is shared between requests, so it must
+    hold plain data (never ORM objects) and be treated as read-only. A result
+    whose tables were written while it was being built is returned but not kept.
+
+    With ``keep``, ``key`` is a tuple and at most that many results whose key
+    starts with the same ``key[0]`` are held, the oldest dropped first.
+    """
+    bind = db.get_bind()
+    with _lookup_lock:
+        if _lookup_cache["bind"] is not bind:
+            _lookup_cache.update(bind=bind, entries={}, kin={})
+        entries = _lookup_cache["entries"]
+        entry = entries.get(key)
+        if entry is not None:
+            return entry[1], entry[2]
+        generations = [_lookup_generations.get(table, 0) for table in tables]
+
+    result = build()
+
+    with _lookup_lock:
+        etag = f"{_LOOKUP_EPOCH}-{next(_lookup_builds)}"
+        if entries is _lookup_cache["entries"] and \
+                generations == [_lookup_generations.get(table, 0) for table in tables]:
+            entries[key] = (frozenset(tables), result, etag)
+            if keep is not None:
+                # Keys sharing key[0], oldest first
+                kin = _lookup_cache["kin"].setdefault(key[0], OrderedDict())
+                kin[key] = None
+                kin.move_to_end(key)
+                while len(kin) > keep:
+                    entries.pop(kin.popitem(last=False)[0], None)
+    return result, etag
+
+
+def _forget_lookups(tables) -> None:
+    with _lookup_lock:
+        for table in tables:
+            _lookup_generations[table] = _lookup_generations.get(table, 0) + 1
+        entries = _lookup_cache["entries"]
+        for key in [k for k, (deps, _, _) in entries.items() if not deps.isdisjoint(tables)]:
+            del entries[key]
+            if isinstance(key, tuple) and key[0] in _lookup_cache["kin"]:
+                _lookup_cache["kin"][key[0]].pop(key, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _forget_lookups_on_flush(session, flush_context):
+    tables = {obj.__table__.name for obj in chain(session.new, session.dirty, session.deleted)}
+    if tables:
+        _forget_lookups(tables)
+        # As for transfer locations: forget them again once this commits.
+        session.info.setdefault("lookup_tables_written", set()).update(tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _forget_lookups_on_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = orm_execute_state.statement.table.name
+        _forget_lookups({table})
+        orm_execute_state.session.info.setdefault("lookup_tables_written", set()).add(table)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_lookups_on_commit(session):
+    tables = session.info.pop("lookup_tables_written", None)
+    if tables:
+        _forget_lookups(tables)
+
+
 # =============================================================================
 # BALANCE CALCULATION FUNCTIONS
 # =============================================================================
@@ -169,13 +352,63 @@ def get_base_currency(db: Session) -> str:
     if configured and configured != "auto":
         return configured
 
+    bind = db.get_bind()
+    if _base_currency_cache["currency"] is not None and _base_currency_cache["bind"] is bind:
+        return _base_currency_cache["currency"]
+
     result = db.query(
         Transaction.currency,
         func.count(Transaction.id).label('count')
     ).group_by(Transaction.currency).order_by(
         func.count(Transaction.id).desc()
     ).first()
-    return result[0] if result else "GBP"
+    currency = result[0] if result else "GBP"
+    _base_currency_cache.update(bind=bind, currency=currency)
+    return currency
+
+
+# The most-used currency only moves when transactions are added, removed or
+# change currency, so the answer is kept per database until one of those is
+# written, rather than re-counting the table on every balance recalculation.
+_base_currency_cache: dict = {"bind": None, "currency": None}
+
+
+@event.listens_for(Session, "after_flush")
+def _forget_base_currency_on_flush(session, flush_context):
+    if any(isinstance(obj, Transaction) for obj in chain(session.new, session.deleted)) or any(
+        isinstance(obj, Transaction) and inspect(obj).attrs.currency.history.has_changes()
+        for obj in session.dirty
+    ):
+        _base_currency_cache["currency"] = None
+        session.info["currencies_written"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _forget_base_currency_on_bulk_write(orm_execute_state):
+    # Bulk inserts and query-level deletes skip the flush. No bulk UPDATE sets
+    # a currency, and the balance writes are bulk UPDATEs, so those are let be.
+    # Matched on the table, since a Core insert (the importer's) has no mapper.
+    if (orm_execute_state.is_insert or orm_execute_state.is_delete) and \
+            orm_execute_state.statement.table.name == Transaction.__tablename__:
+        _base_currency_cache["currency"] = None
+        orm_execute_state.session.info["currencies_written"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_base_currency_on_commit(session):
+    # As for transfer locations: another request may have re-cached the
+    # committed answer while this transaction was still open.
+    if session.info.pop("currencies_written", False):
+        _base_currency_cache["currency"] = None
+
+
+def clear_caches() -> None:
+    """Forget every cached answer, for when the database file itself is replaced."""
+    _latest_rates_cache["key"] = None
+    _transfer_locations_cache.update(ids=None, by_name=None)
+    _base_currency_cache["currency"] = None
+    with _lookup_lock:
+        _lookup_cache.update(entries={}, kin={})
 
 
 def convert_to_base_currency(amount: float, currency: str, base_currency: str, rates: dict) -> float:
@@ -189,6 +422,126 @@ def convert_to_base_currency(amount: float, currency: str, base_currency: str, r
     return amount * (base_rate / currency_rate)
 
 
+def conversion_factors(rates: dict, base_currency: str) -> Dict[str, float]:
+    """
+    Multiplier taking an amount in each rated currency to ``base_currency``, as
+    ``convert_to_base_currency`` computes it. Precompute once so a loop over
+    many rows does one lookup and a multiply each.
+    """
+    base_rate = rates.get(base_currency, 1.0)
+    factors = {currency: base_rate / rate for currency, rate in rates.items()}
+    factors[base_currency] = 1.0
+    return factors
+
+
+def write_current_balances(db: Session, balances: Dict[int, float]) -> None:
+    """
+    Set ``current_balance`` for every account in ``balances`` (id -> balance)
+    with a single UPDATE ... SET current_balance = CASE id ... END.
+
+    Setting the attribute on each loaded Account instead makes the flush emit
+    one UPDATE per account. Values must already be rounded: the
+    ``before_update`` listeners in models.py do not run on this path.
+    """
+    if not balances:
+        return
+    db.execute(
+        update(Account)
+        .where(Account.id.in_(list(balances)))
+        .values(current_balance=case(balances, value=Account.id)),
+        execution_options={"synchronize_session": "fetch"},
+    )
+
+
+def _pence(amount) -> int:
+    return round((amount or 0.0) * 100)
+
+
+def _pence_column(column):
+    """``column`` in whole pence, so sums over it are exact integer arithmetic."""
+    return cast(func.round(func.coalesce(column, 0.0) * 100), Integer)
+
+
+def _write_account_balances(db: Session, seeds: Dict[int, float], tail) -> None:
+    """
+    Rewrite ``account_balance_after`` on the rows matching ``tail`` for the
+    accounts in ``seeds``, and set each account's ``current_balance``.
+
+    ``seeds`` maps account id -> balance just before the first row of ``tail``.
+    The running sum is a window function, so the database walks the rows in
+    (date, id) order itself and nothing is loaded into Python. It adds whole
+    pence, which is exact however long the account's history, and converts
+    back to pounds once per row.
+    """
+    if not seeds:
+        return
+    account_ids = list(seeds)
+    seed = case(
+        {account_id: _pence(start) for account_id, start in seeds.items()},
+        value=Transaction.account_id,
+        else_=0,
+    )
+    running = select(
+        Transaction.id.label("id"),
+        ((seed + func.sum(_pence_column(Transaction.amount)).over(
+            partition_by=Transaction.account_id,
+            order_by=(Transaction.date, Transaction.id),
+        )) / 100.0).label("balance"),
+    ).where(Transaction.account_id.in_(account_ids), tail).subquery()
+    db.execute(
+        update(Transaction)
+        .where(Transaction.id == running.c.id)
+        .values(account_balance_after=running.c.balance),
+        execution_options={"synchronize_session": "fetch"},
+    )
+
+    # Each account ends on its seed plus everything in the tail.
+    tail_sums = dict(
+        db.query(Transaction.account_id, func.sum(_pence_column(Transaction.amount)))
+        .filter(Transaction.account_id.in_(account_ids), tail)
+        .group_by(Transaction.account_id).all()
+    )
+    write_current_balances(db, {
+        account_id: (_pence(start) + (tail_sums.get(account_id) or 0)) / 100
+        for account_id, start in seeds.items()
+    })
+
+
+def _write_total_balances(db: Session, seed: float, tail, rates: dict, base_currency: str) -> int:
+    """
+    Rewrite ``total_balance_after`` on the rows matching ``tail``, starting from
+    ``seed``. Returns the number of rows written.
+
+    The conversion is the one ``convert_to_base_currency`` does, folded into a
+    CASE on the currency so the running sum can stay in SQL.
+    """
+    factor = case(
+        conversion_factors(rates, base_currency),
+        value=Transaction.currency,
+        else_=rates.get(base_currency, 1.0),
+    )
+    running = select(
+        Transaction.id.label("id"),
+        func.round(seed + func.sum(Transaction.amount * factor).over(
+            order_by=(Transaction.date, Transaction.id),
+        ), 2).label("balance"),
+    ).where(tail).subquery()
+    result = db.execute(
+        update(Transaction)
+        .where(Transaction.id == running.c.id)
+        .values(total_balance_after=running.c.balance),
+        execution_options={"synchronize_session": "fetch"},
+    )
+    return result.rowcount
+
+
+def _before(trigger_date: datetime, trigger_id: int):
+    """Rows ahead of the trigger in (date, id) order."""
+    return (Transaction.date < trigger_date) | (
+        (Transaction.date == trigger_date) & (Transaction.id < trigger_id)
+    )
+
+
 def recalculate_balances_from_transaction(
     db: Session,
     transaction_id: int,
@@ -204,72 +557,93 @@ def recalculate_balances_from_transaction(
     rates = get_latest_rates(db)
     base_currency = get_base_currency(db)
 
-    trigger_transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
-    if not trigger_transaction:
+    # This runs on every transaction write, so its fixed lookups are lambda
+    # statements: SQLAlchemy compiles each once and only rebinds the values.
+    trigger = db.execute(lambda_stmt(
+        lambda: select(Transaction.account_id, Transaction.date).where(Transaction.id == transaction_id)
+    )).first()
+    if trigger is None:
         return
 
-    trigger_date = trigger_transaction.date
+    trigger_account_id, trigger_date = trigger
+    trigger_id = transaction_id
 
     if affected_account_ids is None:
-        affected_account_ids = [trigger_transaction.account_id]
-
-    # Step 1: Recalculate account balances only from trigger point forward
-    for account_id in affected_account_ids:
-        account = db.query(Account).filter(Account.id == account_id).first()
-        if not account:
-            continue
-
-        # Get the balance just before the trigger date for this account
-        prev_transaction = db.query(Transaction).filter(
-            Transaction.account_id == account_id,
-            (Transaction.date < trigger_date) |
-            ((Transaction.date == trigger_date) & (Transaction.id < trigger_transaction.id))
-        ).order_by(Transaction.date.desc(), Transaction.id.desc()).first()
-
-        if prev_transaction and prev_transaction.account_balance_after is not None:
-            running_balance = float(prev_transaction.account_balance_after)
-        else:
-            running_balance = float(account.initial_balance or 0.0)
-
-        # Only fetch transactions from the trigger point forward
-        transactions_from = db.query(Transaction).filter(
-            Transaction.account_id == account_id,
-            (Transaction.date > trigger_date) |
-            ((Transaction.date == trigger_date) & (Transaction.id >= trigger_transaction.id))
-        ).order_by(Transaction.date.asc(), Transaction.id.asc()).all()
-
-        for t in transactions_from:
-            running_balance += float(t.amount or 0.0)
-            t.account_balance_after = round(running_balance, 2)
-
-        account.current_balance = round(running_balance, 2)
+        affected_account_ids = [trigger_account_id]
+
+    tail = ~_before(trigger_date, trigger_id)
+
+    # Step 1: Recalculate account balances only from trigger point forward,
+    # each account seeded with its balance just before the trigger. All the
+    # seeds come back in one round trip: a correlated lookup per account, each
+    # an index seek on (account_id, date, id).
+    seed_rows = db.execute(lambda_stmt(
+        lambda: select(
+            Account.id,
+            Account.initial_balance,
+            select(Transaction.account_balance_after).where(
+                Transaction.account_id == Account.id, _before(trigger_date, trigger_id)
+            ).order_by(Transaction.date.desc(), Transaction.id.desc())
+            .limit(1).correlate(Account).scalar_subquery(),
+        ).where(Account.id.in_(affected_account_ids))
+    ))
+    seeds = {
+        account_id: float(prev_balance if prev_balance is not None else initial_balance or 0.0)
+        for account_id, initial_balance, prev_balance in seed_rows
+    }
+
+    _write_account_balances(db, seeds, tail)
 
     # Step 2: Recalculate total balances only from trigger point forward
     # Get total_balance just before the trigger transaction
-    prev_total_tx = db.query(Transaction).filter(
-        (Transaction.date < trigger_date) |
-        ((Transaction.date == trigger_date) & (Transaction.id < trigger_transaction.id))
-    ).order_by(Transaction.date.desc(), Transaction.id.desc()).first()
+    prev_total_tx = db.execute(lambda_stmt(
+        lambda: select(Transaction.total_balance_after).where(
+            _before(trigger_date, trigger_id)
+        ).order_by(Transaction.date.desc(), Transaction.id.desc()).limit(1)
+    )).first()
 
     if prev_total_tx and prev_total_tx.total_balance_after is not None:
         total_balance = float(prev_total_tx.total_balance_after)
     else:
         total_balance = 0.0
 
-    # Only iterate transactions from the trigger point forward
-    transactions_from = db.query(Transaction).filter(
-        (Transaction.date > trigger_date) |
-        ((Transaction.date == trigger_date) & (Transaction.id >= trigger_transaction.id))
-    ).order_by(Transaction.date.asc(), Transaction.id.asc()).all()
+    _write_total_balances(db, total_balance, tail, rates, base_currency)
 
-    for t in transactions_from:
-        converted = convert_to_base_currency(
-            float(t.amount or 0.0), t.currency, base_currency, rates
-        )
-        total_balance += converted
-        t.total_balance_after = round(total_balance, 2)
+    # The trigger is often a row this session just inserted. Its balance
+    # columns were never loaded, so the UPDATEs' session sync has nothing to
+    # expire and they would read as None until commit.
+    trigger_obj = db.identity_map.get(db.identity_key(Transaction, transaction_id))
+    if trigger_obj is not None:
+        db.expire(trigger_obj, ["account_balance_after", "total_balance_after"])
 
-    db.flush()
+
+def refresh_current_balances(db: Session, account_ids: List[int]) -> None:
+    """
+    Set each account's ``current_balance`` to the balance after its last
+    transaction, or its opening balance if it has none. For changes that leave
+    nothing after them to recalculate, such as deleting the latest transaction.
+    """
+    if not account_ids:
+        return
+    ranked = select(
+        Transaction.account_id.label("account_id"),
+        Transaction.account_balance_after.label("balance"),
+        func.row_number().over(
+            partition_by=Transaction.account_id,
+            order_by=(Transaction.date.desc(), Transaction.id.desc()),
+        ).label("rn"),
+    ).where(Transaction.account_id.in_(account_ids)).subquery()
+    last_balances = dict(
+        db.execute(select(ranked.c.account_id, ranked.c.balance).where(ranked.c.rn == 1)).all()
+    )
+    write_current_balances(db, {
+        account_id: round(float(
+            last_balances[account_id] if last_balances.get(account_id) is not None else (initial or 0.0)
+        ), 2)
+        for account_id, initial in db.query(Account.id, Account.initial_balance).filter(
+            Account.id.in_(account_ids)
+        )
+    })
 
 
 def initialise_all_balances(db: Session) -> None:
@@ -279,34 +653,125 @@ def initialise_all_balances(db: Session) -> None:
     """
     rates = get_latest_rates(db)
     base_currency = get_base_currency(db)
-    accounts = db.query(Account).all()
-    
+
     # Step 1: Account balances
-    for account in accounts:
-        transactions = db.query(Transaction).filter(
-            Transaction.account_id == account.id
-        ).order_by(Transaction.date.asc(), Transaction.id.asc()).all()
-        
-        account_balance = float(account.initial_balance) if account.initial_balance is not None else 0.0
-        
-        for transaction in transactions:
-            amount = float(transaction.amount) if transaction.amount is not None else 0.0
-            account_balance += amount
-            transaction.account_balance_after = round(account_balance, 2)
-        
-        account.current_balance = round(account_balance, 2)
-    
+    seeds = {
+        account_id: float(initial or 0.0)
+        for account_id, initial in db.query(Account.id, Account.initial_balance)
+    }
+    _write_account_balances(db, seeds, true())
+
     # Step 2: Total balances
-    all_transactions = db.query(Transaction).order_by(
-        Transaction.date.asc(), Transaction.id.asc()
-    ).all()
-    
-    total_balance = 0.0
-    for transaction in all_transactions:
-        amount = float(transaction.amount) if transaction.amount is not None else 0.0
-        converted = convert_to_base_currency(amount, transaction.currency, base_currency, rates)
-        total_balance += converted
-        transaction.total_balance_after = round(total_balance, 2)
-    
-    db.flush()
-    print(f"Initialised balances for {len(all_transactions)} transactions")
\ No newline at end of file
+    written = _write_total_balances(db, 0.0, true(), rates, base_currency)
+    print(f"Initialised balances for {written} transactions")
+
+
+def recalculate_balances_for_accounts(db: Session, account_ids: List[int]) -> None:
+    """
+    Recalculate every balance of the given accounts from their opening balance,
+    then the portfolio total across all transactions. Both running sums are
+    window functions written back in one UPDATE each, as in
+    ``initialise_all_balances``.
+    """
+    rates = get_latest_rates(db)
+    base_currency = get_base_currency(db)
+
+    # Step 1: Account balances, for the accounts that exist
+    seeds = {
+        account_id: float(initial or 0.0)
+        for account_id, initial in db.query(Account.id, Account.initial_balance).filter(
+            Account.id.in_(account_ids)
+        )
+    }
+    _write_account_balances(db, seeds, true())
+
+    # Step 2: Total balances across all accounts
+    _write_total_balances(db, 0.0, true(), rates, base_currency)
+
+
+# =============================================================================
+# PAYEE STATISTICS
+# =============================================================================
+
+# The fields a payee's "most common" suggestions are derived from.
+_PAYEE_STAT_FIELDS = ("payee_id", "category_id", "location_id", "project_id")
+
+
+def _most_common_per_payee(db: Session, column, payee_ids=None) -> dict:
+    """{payee_id: the ``column`` value used most often by that payee}, counted in
+    SQL. Ties go to the value seen first (lowest transaction id)."""
+    query = db.query(
+        Transaction.payee_id, column, func.count(Transaction.id), func.min(Transaction.id)
+    ).filter(Transaction.payee_id.isnot(None), column.isnot(None))
+    if payee_ids is not None:
+        query = query.filter(Transaction.payee_id.in_(payee_ids))
+    best = {}
+    for payee_id, value, count, first_id in query.group_by(Transaction.payee_id, column):
+        rank = (count, -first_id)
+        if payee_id not in best or rank > best[payee_id][0]:
+            best[payee_id] = (rank, value)
+    return {payee_id: value for payee_id, (_, value) in best.items()}
+
+
+def refresh_payee_stats(db: Session, payee_ids=None) -> int:
+    """
+    Recompute the most-common category/location/project of ``payee_ids`` (every
+    payee when None). Returns the number of payees written.
+    """
+    categories = _most_common_per_payee(db, Transaction.category_id, payee_ids)
+    locations = _most_common_per_payee(db, Transaction.location_id, payee_ids)
+    projects = _most_common_per_payee(db, Transaction.project_id, payee_ids)
+    payees = db.query(Payee.id)
+    if payee_ids is not None:
+        payees = payees.filter(Payee.id.in_(payee_ids))
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": payee_id,
+            "most_common_category_id": categories.get(payee_id),
+            "most_common_location_id": locations.get(payee_id),
+            "most_common_project_id": projects.get(payee_id),
+            "updated_at": now,
+        }
+        for (payee_id,) in payees
+    ]
+    db.bulk_update_mappings(Payee, rows)
+    return len(rows)
+
+
+def note_payees_touched(session: Session, payee_ids) -> None:
+    """Have these payees recounted when ``session`` commits. Query-level writes
+    skip the flush that would notice them, so they call this themselves."""
+    payee_ids = {p for p in payee_ids if p}
+    if payee_ids:
+        session.info.setdefault("payees_touched", set()).update(payee_ids)
+
+
+# Rather than leaving every payee to the nightly recount, the payees whose
+# transactions were added, removed or re-assigned in a transaction are noted
+# as it flushes and recounted just before it commits. That touches only their
+# own rows, through the payee index. Bulk writes (imports, merges) still rely
+# on the full recount.
+@event.listens_for(Session, "after_flush")
+def _note_payees_on_flush(session, flush_context):
+    touched = set()
+    for obj in chain(session.new, session.deleted):
+        if isinstance(obj, Transaction) and obj.payee_id:
+            touched.add(obj.payee_id)
+    for obj in session.dirty:
+        if not isinstance(obj, Transaction):
+            continue
+        attrs = inspect(obj).attrs
+        if any(attrs[field].history.has_changes() for field in _PAYEE_STAT_FIELDS):
+            touched.update(p for p in (obj.payee_id, *attrs.payee_id.history.deleted) if p)
+    note_payees_touched(session, touched)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_payees_on_commit(session):
+    # before_commit runs ahead of the commit's own flush, so flush here to
+    # count against (and note the payees of) everything pending.
+    session.flush()
+    payee_ids = session.info.pop("payees_touched", None)
+    if payee_ids:
+        refresh_payee_stats(session, list(payee_ids))
@@ -23,7 +23,8 @@ Newlines inside values are replaced with spaces (Financisto does the same).
 from __future__ import annotations
 
 import gzip
-from typing import Dict, List, Tuple
+import io
+from typing import BinaryIO, Dict, List, Tuple
 
 GZIP_MAGIC = b"\x1f\x8b"
 
@@ -57,6 +58,15 @@ def decompress(raw: bytes) -> bytes:
     return raw
 
 
+def open_decompressed(raw: bytes) -> BinaryIO:
+    """
+    Like ``decompress``, but as a stream that gunzips as it is read, so the
+    inflated file never has to be held in memory whole.
+    """
+    stream = io.BytesIO(raw)
+    return gzip.GzipFile(fileobj=stream) if raw[:2] == GZIP_MAGIC else stream
+
+
 def parse(raw: bytes) -> Tuple[Dict[str, str], List[Entity]]:
     """
     Parse a backup file into (header, entities).
@@ -26,10 +26,12 @@ from __future__ import annotations
 
 import csv
 import io
+import operator
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
 from backend import models
@@ -40,6 +42,9 @@ from backend.integrations.financisto import backup_format, model as fz
 TRANSFER_IN = "Transfer In"
 TRANSFER_OUT = "Transfer Out"
 
+# Transactions written per bulk INSERT.
+INSERT_BATCH_SIZE = 1000
+
 
 # ---------------------------------------------------------------------------
 # Normalised intermediate representation (already shaped like Delfin)
@@ -374,9 +379,28 @@ CSV_HEADERS = [
 ]
 
 
+# The CSV columns the importer reads, in the order normalize_csv unpacks them.
+_CSV_COLUMNS = (
+    "date", "time", "account", "amount", "currency", "category", "parent",
+    "payee", "location", "project", "note", "original currency",
+)
+
+
 def normalize_csv(raw: bytes, report: CompatibilityReport) -> NormalizedData:
-    text = backup_format.decompress(raw).decode("utf-8-sig", errors="replace")
-    reader = csv.DictReader(io.StringIO(text))
+    # Decompress and decode as the reader asks for lines, rather than building
+    # the whole inflated file and then a decoded copy of it up front.
+    text = io.TextIOWrapper(
+        backup_format.open_decompressed(raw), encoding="utf-8-sig", errors="replace", newline=""
+    )
+    # Plain rows, with each column's position looked up once from the header,
+    # rather than a DictReader building a dict for every row. Rows are cut or
+    # padded to the header's width plus one blank; a column the file lacks
+    # points at that blank, which reads the same as DictReader's None below.
+    reader = csv.reader(text)
+    header = next(reader, [])
+    width = len(header)
+    position = {name: i for i, name in enumerate(header)}
+    columns = operator.itemgetter(*(position.get(name, width) for name in _CSV_COLUMNS))
     data = NormalizedData()
 
     # Financisto writes a split as a parent row whose category is the literal
@@ -438,42 +462,46 @@ def normalize_csv(raw: bytes, report: CompatibilityReport) -> NormalizedData:
                    ".backup format, to keep the breakdown.")
 
     for row in reader:
-        raw_date = (row.get("date") or "").strip()
+        if not row:
+            continue   # a blank line, which DictReader also skipped
+        if len(row) != width:
+            row = (row + [""] * width)[:width]
+        row.append("")
+        (raw_date, raw_time, account, raw_amount, currency, category, parent,
+         payee, location, project, note, orig_cur) = (v.strip() for v in columns(row))
 
         # A "~" row continues the split above it.
         if raw_date == "~" and pending is not None:
-            _append_csv_split_line(row, pending, report)
+            _append_csv_split_line(dict(zip(header, row)), pending, report)
             continue
 
         flush_pending()
 
-        dt = _parse_csv_datetime(row.get("date"), row.get("time"))
+        dt = _parse_csv_datetime(raw_date, raw_time)
         if dt is None:
             report.add("bad_date", Severity.SKIPPED, "CSV row with no valid date skipped")
             continue
 
-        if (row.get("category") or "").strip().upper() == "SPLIT":
+        if category.upper() == "SPLIT":
             split_seq += 1
-            pending = _start_csv_split(row, dt, split_seq)
+            pending = _start_csv_split(dict(zip(header, row)), dt, split_seq)
             continue
 
-        account = (row.get("account") or "").strip()
-        currency = (row.get("currency") or "GBP").strip() or "GBP"
+        currency = currency or "GBP"
         try:
-            amount = float((row.get("amount") or "0").replace(",", "."))
+            amount = float((raw_amount or "0").replace(",", "."))
         except ValueError:
             report.add("bad_amount", Severity.SKIPPED, "CSV row with invalid amount skipped")
             continue
 
-        note = (row.get("note") or "").strip() or None
-        category = (row.get("category") or "").strip() or None
-        parent = (row.get("parent") or "").strip() or None
-        payee = (row.get("payee") or "").strip() or None
-        location = (row.get("location") or "").strip() or None
-        project = (row.get("project") or "").strip() or None
+        note = note or None
+        category = category or None
+        parent = parent or None
+        payee = payee or None
+        location = location or None
+        project = project or None
 
         # Foreign original amount cannot be preserved separately.
-        orig_cur = (row.get("original currency") or "").strip()
         if orig_cur and orig_cur != currency:
             report.add("original_amount", Severity.INFO, "Foreign original amounts simplified",
                        "Only the account-currency amount was kept.")
@@ -578,20 +606,35 @@ def _register_csv_entities(data: NormalizedData, txn: NormalizedTxn) -> None:
         data.projects.add(txn.project_name)
 
 
+# Tried in order once the ISO fast path has failed. The ISO ones stay: strptime
+# also takes values fromisoformat is stricter about, such as a one-digit hour.
+_CSV_DATETIME_FORMATS = (
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d",
+    "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y",
+    "%m/%d/%Y %H:%M:%S", "%m/%d/%Y",
+)
+
+
 def _parse_csv_datetime(date_str: Optional[str], time_str: Optional[str]) -> Optional[datetime]:
     date_str = (date_str or "").strip()
     time_str = (time_str or "").strip()
     if not date_str or date_str == "~":
         return None
     combined = f"{date_str} {time_str}".strip()
-    fmts = [
-        "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d",
-        "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y",
-        "%m/%d/%Y %H:%M:%S", "%m/%d/%Y",
-    ]
-    for fmt in fmts:
+    # Financisto writes ISO dates ("%Y-%m-%d %H:%M:%S"). fromisoformat parses
+    # those in C, several times faster than strptime, which matters once per
+    # row on a large export. An offset would give an aware datetime, which the
+    # rest of Delfin does not use, so such a value falls through to the slow
+    # path and is handled there as before.
+    try:
+        dt = datetime.fromisoformat(combined)
+        if dt.tzinfo is None:
+            return dt
+    except ValueError:
+        pass
+    for fmt in _CSV_DATETIME_FORMATS:
         try:
-            return datetime.strptime(combined.strip(), fmt)
+            return datetime.strptime(combined, fmt)
         except ValueError:
             continue
     return None
@@ -612,69 +655,52 @@ def apply_to_database(
         db.flush()
 
     # -- entity caches ------------------------------------------------------
+    # Every existing entity is read in one query per table, so resolving a name
+    # never costs a lookup of its own. Lowest id wins when names repeat, as
+    # the per-name query this replaces returned. New entities are only added
+    # here; one flush then hands out all their ids together.
+    def existing(model, key):
+        return {key(obj): obj for obj in db.query(model).order_by(model.id.desc())}
+
+    known_accounts = existing(models.Account, lambda a: a.name)
+    known_categories = existing(models.Category, lambda c: (c.parent or None, c.name))
+    known_payees = existing(models.Payee, lambda p: p.name)
+    known_locations = existing(models.Location, lambda l: l.name)
+    known_projects = existing(models.Project, lambda p: p.name)
+
+    # The entities this import touches, reported back to the caller.
     acc_cache: Dict[str, models.Account] = {}
     cat_cache: Dict[Tuple[Optional[str], str], models.Category] = {}
     payee_cache: Dict[str, models.Payee] = {}
     loc_cache: Dict[str, models.Location] = {}
     proj_cache: Dict[str, models.Project] = {}
 
+    def resolve(cache: dict, known: dict, key, make):
+        if key in cache:
+            return cache[key]
+        obj = known.get(key)
+        if obj is None:
+            obj = known[key] = make()
+            db.add(obj)
+        cache[key] = obj
+        return obj
+
     def get_account(name: str, currency: str, atype: Optional[str]) -> models.Account:
-        if name in acc_cache:
-            return acc_cache[name]
-        acc = db.query(models.Account).filter(models.Account.name == name).first()
-        if not acc:
-            acc = models.Account(name=name, currency=currency or "GBP", type=atype)
-            db.add(acc)
-            db.flush()
-        acc_cache[name] = acc
-        return acc
+        return resolve(acc_cache, known_accounts, name,
+                       lambda: models.Account(name=name, currency=currency or "GBP", type=atype))
 
     def get_category(parent: Optional[str], name: str, ctype: Optional[str]) -> models.Category:
-        key = (parent or None, name)
-        if key in cat_cache:
-            return cat_cache[key]
-        cat = db.query(models.Category).filter(
-            models.Category.name == name, models.Category.parent == (parent or None)
-        ).first()
-        if not cat:
-            cat = models.Category(name=name, parent=parent or None, type=ctype)
-            db.add(cat)
-            db.flush()
-        cat_cache[key] = cat
-        return cat
+        return resolve(cat_cache, known_categories, (parent or None, name),
+                       lambda: models.Category(name=name, parent=parent or None, type=ctype))
 
     def get_payee(name: str) -> models.Payee:
-        if name in payee_cache:
-            return payee_cache[name]
-        p = db.query(models.Payee).filter(models.Payee.name == name).first()
-        if not p:
-            p = models.Payee(name=name)
-            db.add(p)
-            db.flush()
-        payee_cache[name] = p
-        return p
+        return resolve(payee_cache, known_payees, name, lambda: models.Payee(name=name))
 
     def get_location(name: str) -> models.Location:
-        if name in loc_cache:
-            return loc_cache[name]
-        loc = db.query(models.Location).filter(models.Location.name == name).first()
-        if not loc:
-            loc = models.Location(name=name)
-            db.add(loc)
-            db.flush()
-        loc_cache[name] = loc
-        return loc
+        return resolve(loc_cache, known_locations, name, lambda: models.Location(name=name))
 
     def get_project(name: str) -> models.Project:
-        if name in proj_cache:
-            return proj_cache[name]
-        pr = db.query(models.Project).filter(models.Project.name == name).first()
-        if not pr:
-            pr = models.Project(name=name)
-            db.add(pr)
-            db.flush()
-        proj_cache[name] = pr
-        return pr
+        return resolve(proj_cache, known_projects, name, lambda: models.Project(name=name))
 
     # Pre-create entities (so empty accounts/categories survive an import).
     for name, meta in data.accounts.items():
@@ -687,6 +713,7 @@ def apply_to_database(
         get_location(name)
     for name in data.projects:
         get_project(name)
+    db.flush()
 
     # -- duplicate detection (merge only) -----------------------------------
     # Two lines of one split can legitimately be identical (same amount, same
@@ -708,9 +735,32 @@ def apply_to_database(
 
     # Lines of an incoming split, collected so they can be keyed together once
     # the database has handed out their ids.
-    split_rows: Dict[str, List[models.Transaction]] = {}
+    split_rows: Dict[str, List[int]] = {}
     incoming_line_no: Dict[str, int] = {}
 
+    # Rows are queued as plain dicts and written a batch at a time through one
+    # Core executemany INSERT, instead of an ORM object (and its unit-of-work
+    # bookkeeping) per transaction. Core rather than ORM bulk insert, which
+    # splits a batch wherever the pattern of NULL columns changes. SQLAlchemy
+    # sends the batch as multi-row INSERT ... VALUES statements; asking it to
+    # order the RETURNING rows would make it fall back to one row per INSERT on
+    # SQLite. Each row takes the next rowid in VALUES order, so the sorted ids
+    # line up with the batch for the split lines.
+    batch: List[dict] = []
+    batch_split_keys: List[Optional[str]] = []
+    tx_table = models.Transaction.__table__
+    insert_rows = tx_table.insert().returning(tx_table.c.id)
+
+    def write_batch() -> None:
+        if not batch:
+            return
+        ids = sorted(db.execute(insert_rows, batch).scalars())
+        for split_key, tx_id in zip(batch_split_keys, ids):
+            if split_key:
+                split_rows.setdefault(split_key, []).append(tx_id)
+        batch.clear()
+        batch_split_keys.clear()
+
     inserted = 0
     duplicates = 0
     for ntx in data.transactions:
@@ -728,6 +778,8 @@ def apply_to_database(
         payee = get_payee(ntx.payee_name) if ntx.payee_name else None
         location = get_location(ntx.location_name) if ntx.location_name else None
         project = get_project(ntx.project_name) if ntx.project_name else None
+        if any(e is not None and e.id is None for e in (account, category, payee, location, project)):
+            db.flush()   # an entity first met here, not listed up front
 
         line_no = 0
         if ntx.split_key:
@@ -744,35 +796,35 @@ def apply_to_database(
             continue
         existing_keys.add(key)
 
-        row = models.Transaction(
-            date=ntx.date,
-            amount=round(ntx.amount, 2),
-            currency=ntx.currency or "GBP",
-            note=ntx.note,
-            account_id=account.id,
-            category_id=category.id if category else None,
-            payee_id=payee.id if payee else None,
-            location_id=location.id if location else None,
-            project_id=project.id if project else None,
-        )
-        db.add(row)
-        if ntx.split_key:
-            split_rows.setdefault(ntx.split_key, []).append(row)
+        batch.append({
+            "date": ntx.date,
+            "amount": round(ntx.amount, 2),
+            "currency": ntx.currency or "GBP",
+            "note": ntx.note,
+            "account_id": account.id,
+            "category_id": category.id if category else None,
+            "payee_id": payee.id if payee else None,
+            "location_id": location.id if location else None,
+            "project_id": project.id if project else None,
+        })
+        batch_split_keys.append(ntx.split_key)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            write_batch()
         inserted += 1
 
-    db.flush()
+    write_batch()
 
     # Key each split on its lowest line id, the same anchor the API uses. A
     # split whose siblings were all skipped as duplicates is just a transaction.
-    splits_imported = 0
-    for rows in split_rows.values():
-        if len(rows) < 2:
+    split_groups = []
+    for ids in split_rows.values():
+        if len(ids) < 2:
             continue
-        group_id = min(r.id for r in rows)
-        for r in rows:
-            r.split_group_id = group_id
-        splits_imported += 1
-    db.flush()
+        group_id = min(ids)
+        split_groups.extend({"id": tx_id, "split_group_id": group_id} for tx_id in ids)
+    splits_imported = sum(1 for ids in split_rows.values() if len(ids) >= 2)
+    if split_groups:
+        db.execute(update(models.Transaction), split_groups)
 
     initialise_all_balances(db)
     db.commit()
@@ -1,16 +1,20 @@
 from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import FileResponse, RedirectResponse, JSONResponse
+from fastapi.responses import FileResponse, RedirectResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.middleware.sessions import SessionMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, raiseload
 from typing import List, Optional
 from datetime import datetime, date, timedelta, time
-from sqlalchemy import func as sql_func, case, and_, or_, func
+from sqlalchemy import func as sql_func, case, and_, or_, func, insert, select, update, exists, text
+from sqlalchemy import values as sql_values, column, literal, Float, Integer, String
+import base64
 import shutil
 import os
+from collections import Counter, defaultdict
+from itertools import groupby
 from backend.database import get_db
 from backend import database
 from backend import models, schemas
@@ -21,10 +25,19 @@ from backend.models import Account, Category, Payee, Location, Project, Transact
 from backend.schemas import ExchangeRateResponse
 from backend.helpers import (
     recalculate_balances_from_transaction,
+    refresh_current_balances,
+    write_current_balances,
     initialise_all_balances,
+    recalculate_balances_for_accounts,
     get_rates_bulk,
     get_latest_rates,
-    get_base_currency
+    get_base_currency,
+    get_transfer_location_ids,
+    get_transfer_locations,
+    ensure_transfer_locations,
+    cached_lookup,
+    clear_caches,
+    note_payees_touched,
 )
 from backend import budget_engine
 from backend import loan_engine
@@ -148,6 +161,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods (GET, POST, etc.)
     allow_headers=["*"],  # Allow all headers
+    # Cross-origin pages (API_URL on another port) only see the headers
+    # listed here; the transaction list pages on X-Next-Cursor.
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -264,12 +280,30 @@ def _encrypt_existing_database(dek_hex: str) -> None:
             except OSError: pass
     os.replace(enc, plain)
 
+def _lookup_page(request: Request, response: Response, items: list, etag: str,
+                 skip: int = 0, limit: Optional[int] = None):
+    """
+    The ``skip``/``limit`` page of a cached lookup list, tagged with an ETag, or
+    an empty 304 Not Modified when the client's ``If-None-Match`` shows it
+    already holds that version. ``no-cache`` makes the browser revalidate on
+    every fetch, so an edit still shows up straight away.
+    """
+    etag = f'"{etag}-{skip}-{limit}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in (t.strip() for t in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return items[skip:None if limit is None else skip + limit]
+
+
 # ============================================
 # ACCOUNTS ENDPOINTS
 # ============================================
 
 @app.get("/accounts", response_model=List[schemas.AccountResponse])
 def get_accounts(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     include_closed: bool = False,  # NEW: parameter to include closed accounts
@@ -279,15 +313,18 @@ def get_accounts(
     Retrieve all accounts. By default, only returns active accounts.
     Set include_closed=true to include closed accounts as well.
     """
-    query = db.query(models.Account)
-    # Filter by active status unless include_closed is True
-    if not include_closed:
-        query = query.filter(models.Account.is_active == 1)
-    accounts = query.offset(skip).limit(limit).all()
-    return accounts
+    def build():
+        query = db.query(models.Account)
+        # Filter by active status unless include_closed is True
+        if not include_closed:
+            query = query.filter(models.Account.is_active == 1)
+        return [schemas.AccountResponse.model_validate(a).model_dump() for a in query.order_by(models.Account.id)]
 
+    accounts, etag = cached_lookup(db, ("accounts", include_closed), ("accounts",), build)
+    return _lookup_page(request, response, accounts, etag, skip, limit)
 
-@app.get("/accounts/with-balances")
+
+@app.get("/accounts/with-balances", response_model=List[schemas.AccountWithBalance])
 def get_accounts_with_balances(
     include_closed: bool = False,
     db: Session = Depends(get_db)
@@ -296,34 +333,62 @@ def get_accounts_with_balances(
     Get all accounts with their current balances from the last transaction.
     More efficient than getting balance separately for each account.
     """
-    query = db.query(models.Account)
+    # Each account's most recent balance as a correlated subquery, so every
+    # balance arrives in one statement. idx_transaction_account_date_id_asc
+    # read backwards answers each one with a single index seek, where ranking
+    # every transaction with a window function had to scan the whole table.
+    T = models.Transaction
+    latest_balance = (
+        select(T.account_balance_after)
+        .where(T.account_id == models.Account.id)
+        .order_by(T.date.desc(), T.id.desc())
+        .limit(1)
+        .correlate(models.Account)
+        .scalar_subquery()
+    )
+
+    query = db.query(
+        models.Account.id,
+        models.Account.name,
+        models.Account.type,
+        models.Account.currency,
+        models.Account.initial_balance,
+        func.coalesce(latest_balance, models.Account.initial_balance).label("current_balance"),
+        models.Account.is_active,
+        models.Account.created_at,
+    )
     if not include_closed:
         query = query.filter(models.Account.is_active == 1)
-    accounts = query.all()
 
-    accounts_with_balances = []
-    for account in accounts:
-        # Get last transaction for this account
-        last_transaction = db.query(models.Transaction).filter(
-            models.Transaction.account_id == account.id
-        ).order_by(models.Transaction.date.desc(), models.Transaction.id.desc()).first()
+    return query.order_by(models.Account.id).all()
 
-        if last_transaction and last_transaction.account_balance_after is not None:
-            current_balance = last_transaction.account_balance_after
-        else:
-            current_balance = account.initial_balance
-
-        accounts_with_balances.append({
-            "id": account.id,
-            "name": account.name,
-            "type": account.type,
-            "currency": account.currency,
-            "initial_balance": account.initial_balance,
-            "current_balance": current_balance,
-            "is_active": account.is_active,
-            "created_at": account.created_at
-        })
-    return accounts_with_balances
+
+def _insert_returning(db: Session, model, schema, values: dict):
+    """
+    Insert one row and return it as ``schema``, all in one round trip: RETURNING
+    hands back the complete row, and it is serialised before the commit
+    expires it, so nothing has to be read back with a SELECT.
+    """
+    row = db.execute(insert(model).values(**values).returning(model)).scalar_one()
+    created = schema.model_validate(row)
+    db.commit()
+    return created
+
+
+def _update_returning(db: Session, model, schema, object_id: int, values: dict, not_found: str):
+    """
+    Update one row by id and return it as ``schema``: the UPDATE's RETURNING
+    clause both reports whether the row existed and hands back its new state,
+    so there is no SELECT before the write and no refresh after it.
+    """
+    row = db.execute(
+        update(model).where(model.id == object_id).values(**values).returning(model)
+    ).scalar_one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    updated = schema.model_validate(row)
+    db.commit()
+    return updated
 
 
 @app.post("/accounts", response_model=schemas.AccountResponse)
@@ -334,11 +399,7 @@ def create_account(
     """
     Create a new account.
     """
-    db_account = models.Account(**account.dict())
-    db.add(db_account)
-    db.commit()
-    db.refresh(db_account)
-    return db_account
+    return _insert_returning(db, models.Account, schemas.AccountResponse, account.dict())
 
 
 # ============================================
@@ -347,6 +408,8 @@ def create_account(
 
 @app.get("/categories", response_model=List[schemas.CategoryResponse])
 def get_categories(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 200,
     db: Session = Depends(get_db)
@@ -354,8 +417,11 @@ def get_categories(
     """
     Retrieve all categories.
     """
-    categories = db.query(models.Category).offset(skip).limit(limit).all()
-    return categories
+    categories, etag = cached_lookup(db, "categories", ("categories",), lambda: [
+        schemas.CategoryResponse.model_validate(c).model_dump()
+        for c in db.query(models.Category).order_by(models.Category.id)
+    ])
+    return _lookup_page(request, response, categories, etag, skip, limit)
 
 
 @app.post("/categories", response_model=schemas.CategoryResponse)
@@ -366,11 +432,7 @@ def create_category(
     """
     Create a new category.
     """
-    db_category = models.Category(**category.dict())
-    db.add(db_category)
-    db.commit()
-    db.refresh(db_category)
-    return db_category
+    return _insert_returning(db, models.Category, schemas.CategoryResponse, category.dict())
 
 
 @app.delete("/categories/{category_id}")
@@ -385,12 +447,11 @@ def delete_category(
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
-    # Check if any transactions use this category
-    transaction_count = db.query(models.Transaction).filter(
-        models.Transaction.category_id == category_id
-    ).count()
-    
-    if transaction_count > 0:
+    # Check if any transactions use this category (stops at the first one;
+    # the full count is only needed for the error message)
+    in_use = models.Transaction.category_id == category_id
+    if db.query(exists().where(in_use)).scalar():
+        transaction_count = db.query(func.count(models.Transaction.id)).filter(in_use).scalar()
         raise HTTPException(
             status_code=400, 
             detail=f"Cannot delete category: {transaction_count} transactions are using it"
@@ -398,10 +459,9 @@ def delete_category(
     
     # Check if this is a parent category with subcategories
     if not category.parent:
-        subcategories = db.query(models.Category).filter(
-            models.Category.parent == category.name
-        ).count()
-        if subcategories > 0:
+        is_child = models.Category.parent == category.name
+        if db.query(exists().where(is_child)).scalar():
+            subcategories = db.query(func.count(models.Category.id)).filter(is_child).scalar()
             raise HTTPException(
                 status_code=400,
                 detail=f"Cannot delete parent category: {subcategories} subcategories exist"
@@ -417,11 +477,26 @@ def delete_category(
 # ============================================
 
 @app.get("/payees", response_model=List[schemas.PayeeWithDetails])
-def get_payees(db: Session = Depends(get_db)):
+def get_payees(request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Retrieve all payees with their most common associations.
     """
-    payees = db.query(Payee).all()
+    payees, etag = cached_lookup(
+        db, "payees", ("payees", "transactions", "categories", "locations", "projects"),
+        lambda: _payee_list(db),
+    )
+    return _lookup_page(request, response, payees, etag)
+
+
+def _payee_list(db: Session) -> list:
+    """Every payee with its transaction count and most-used categories."""
+    # The three "most common" names come in on the same SELECT instead of a
+    # lazy load per payee.
+    payees = db.query(Payee).options(
+        joinedload(Payee.most_common_category),
+        joinedload(Payee.most_common_location),
+        joinedload(Payee.most_common_project),
+    ).all()
 
     # Bulk stats so we don't run a query per payee.
     tx_counts = dict(
@@ -483,11 +558,7 @@ def create_payee(
     existing_payee = db.query(models.Payee).filter(models.Payee.name == payee.name).first()
     if existing_payee:
         return existing_payee  # Return existing instead of error
-    db_payee = models.Payee(**payee.dict())
-    db.add(db_payee)
-    db.commit()
-    db.refresh(db_payee)
-    return db_payee
+    return _insert_returning(db, models.Payee, schemas.PayeeResponse, payee.dict())
 
 
 # Add these endpoints after the create_payee endpoint (after line 182 in main.py)
@@ -500,9 +571,24 @@ def recalculate_payee_stats(payee_id: int, db: Session = Depends(get_db)):
     if not payee:
         raise HTTPException(status_code=404, detail="Payee not found")
 
-    # Get all transactions for this payee
-    transactions = db.query(Transaction).filter(Transaction.payee_id == payee_id).all()
-    if not transactions:
+    # Count occurrences over just the three ids, streamed in batches rather than
+    # hydrating every Transaction of the payee.
+    category_counts, location_counts, project_counts = Counter(), Counter(), Counter()
+    transaction_count = 0
+    for category_id, location_id, project_id in db.query(Transaction).filter(
+        Transaction.payee_id == payee_id
+    ).with_entities(
+        Transaction.category_id, Transaction.location_id, Transaction.project_id
+    ).yield_per(1000):
+        transaction_count += 1
+        if category_id:
+            category_counts[category_id] += 1
+        if location_id:
+            location_counts[location_id] += 1
+        if project_id:
+            project_counts[project_id] += 1
+
+    if not transaction_count:
         # Reset to None if no transactions
         payee.most_common_category_id = None
         payee.most_common_location_id = None
@@ -511,22 +597,10 @@ def recalculate_payee_stats(payee_id: int, db: Session = Depends(get_db)):
         db.commit()
         return {"message": "Payee statistics reset (no transactions found)"}
 
-    # Count occurrences
-    category_counts = {}
-    location_counts = {}
-    project_counts = {}
-    for trans in transactions:
-        if trans.category_id:
-            category_counts[trans.category_id] = category_counts.get(trans.category_id, 0) + 1
-        if trans.location_id:
-            location_counts[trans.location_id] = location_counts.get(trans.location_id, 0) + 1
-        if trans.project_id:
-            project_counts[trans.project_id] = project_counts.get(trans.project_id, 0) + 1
-
-    # Get most common values
-    payee.most_common_category_id = max(category_counts, key=category_counts.get) if category_counts else None
-    payee.most_common_location_id = max(location_counts, key=location_counts.get) if location_counts else None
-    payee.most_common_project_id = max(project_counts, key=project_counts.get) if project_counts else None
+    # Get most common values (ties go to the one seen first)
+    payee.most_common_category_id = category_counts.most_common(1)[0][0] if category_counts else None
+    payee.most_common_location_id = location_counts.most_common(1)[0][0] if location_counts else None
+    payee.most_common_project_id = project_counts.most_common(1)[0][0] if project_counts else None
     payee.updated_at = datetime.utcnow()
     db.commit()
     return {
@@ -535,7 +609,7 @@ def recalculate_payee_stats(payee_id: int, db: Session = Depends(get_db)):
         "most_common_category_id": payee.most_common_category_id,
         "most_common_location_id": payee.most_common_location_id,
         "most_common_project_id": payee.most_common_project_id,
-        "transaction_count": len(transactions)
+        "transaction_count": transaction_count
     }
 
 
@@ -664,6 +738,8 @@ def merge_payees(payee_id: int, duplicate_id: int, db: Session = Depends(get_db)
 
 @app.get("/locations", response_model=List[schemas.LocationResponse])
 def get_locations(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 200,
     db: Session = Depends(get_db)
@@ -671,6 +747,12 @@ def get_locations(
     """
     Retrieve all locations ordered by usage count (most used first).
     """
+    locations, etag = cached_lookup(db, "locations", ("locations", "transactions"), lambda: _location_list(db))
+    return _lookup_page(request, response, locations, etag, skip, limit)
+
+
+def _location_list(db: Session) -> list:
+    """Every location with its transaction count, most used first."""
     counts = dict(
         db.query(models.Transaction.location_id, func.count(models.Transaction.id))
         .filter(models.Transaction.location_id.isnot(None))
@@ -682,7 +764,7 @@ def get_locations(
         for loc in db.query(models.Location).all()
     ]
     result.sort(key=lambda x: x["transaction_count"], reverse=True)
-    return result[skip:skip + limit]
+    return result
 
 
 @app.post("/locations", response_model=schemas.LocationResponse)
@@ -693,11 +775,7 @@ def create_location(
     """
     Create a new location.
     """
-    db_location = models.Location(**location.dict())
-    db.add(db_location)
-    db.commit()
-    db.refresh(db_location)
-    return db_location
+    return _insert_returning(db, models.Location, schemas.LocationResponse, location.dict())
 
 
 _SYSTEM_LOCATIONS = ("Transfer In", "Transfer Out")
@@ -764,6 +842,8 @@ def merge_locations(location_id: int, duplicate_id: int, db: Session = Depends(g
 
 @app.get("/projects", response_model=List[schemas.ProjectResponse])
 def get_projects(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 200,
     db: Session = Depends(get_db)
@@ -771,6 +851,12 @@ def get_projects(
     """
     Retrieve all projects ordered by usage count (most used first).
     """
+    projects, etag = cached_lookup(db, "projects", ("projects", "transactions"), lambda: _project_list(db))
+    return _lookup_page(request, response, projects, etag, skip, limit)
+
+
+def _project_list(db: Session) -> list:
+    """Every project with its transaction count, most used first."""
     counts = dict(
         db.query(models.Transaction.project_id, func.count(models.Transaction.id))
         .filter(models.Transaction.project_id.isnot(None))
@@ -782,7 +868,7 @@ def get_projects(
         for proj in db.query(models.Project).all()
     ]
     result.sort(key=lambda x: x["transaction_count"], reverse=True)
-    return result[skip:skip + limit]
+    return result
 
 
 @app.post("/projects", response_model=schemas.ProjectResponse)
@@ -793,11 +879,7 @@ def create_project(
     """
     Create a new project.
     """
-    db_project = models.Project(**project.dict())
-    db.add(db_project)
-    db.commit()
-    db.refresh(db_project)
-    return db_project
+    return _insert_returning(db, models.Project, schemas.ProjectResponse, project.dict())
 
 
 @app.delete("/projects/{project_id}")
@@ -864,17 +946,10 @@ def update_account(
     """
     Update an existing account.
     """
-    db_account = db.query(models.Account).filter(models.Account.id == account_id).first()
-    if not db_account:
-        raise HTTPException(status_code=404, detail="Account not found")
-
-    # Update fields
-    for key, value in account.dict().items():
-        setattr(db_account, key, value)
-
-    db.commit()
-    db.refresh(db_account)
-    return db_account
+    return _update_returning(
+        db, models.Account, schemas.AccountResponse, account_id,
+        account.model_dump(exclude_unset=True), "Account not found",
+    )
 
 
 @app.patch("/accounts/{account_id}/close")
@@ -886,23 +961,32 @@ def close_account(
     Close an account. Closed accounts won't appear in dropdowns or active account lists,
     but all historical data is preserved.
     """
-    db_account = db.query(models.Account).filter(models.Account.id == account_id).first()
-    if not db_account:
-        raise HTTPException(status_code=404, detail="Account not found")
-
-    # Check if balance is approximately zero (accounting for floating point errors)
-    if abs(db_account.current_balance) > 0.01:
+    # Close it only if the balance is approximately zero (accounting for floating
+    # point errors): one UPDATE does the check and the write together.
+    db_account = db.execute(
+        update(models.Account)
+        .where(models.Account.id == account_id, func.abs(models.Account.current_balance) <= 0.01)
+        .values(is_active=0)
+        .returning(models.Account)
+    ).scalar_one_or_none()
+
+    if db_account is None:
+        # Nothing closed: find out whether the account is missing or still holds money
+        current_balance = db.execute(
+            select(models.Account.current_balance).where(models.Account.id == account_id)
+        ).first()
+        if current_balance is None:
+            raise HTTPException(status_code=404, detail="Account not found")
         raise HTTPException(
             status_code=400,
-            detail=f"Cannot close account with non-zero balance: {db_account.current_balance}"
+            detail=f"Cannot close account with non-zero balance: {current_balance[0]}"
         )
 
-    db_account.is_active = 0
+    account = schemas.AccountResponse.model_validate(db_account)
     db.commit()
-    db.refresh(db_account)
     return {
-        "message": f"Account '{db_account.name}' closed successfully",
-        "account": db_account
+        "message": f"Account '{account.name}' closed successfully",
+        "account": account
     }
 
 
@@ -919,11 +1003,12 @@ def open_account(
         raise HTTPException(status_code=404, detail="Account not found")
 
     db_account.is_active = 1
+    db.flush()
+    account = schemas.AccountResponse.model_validate(db_account)
     db.commit()
-    db.refresh(db_account)
     return {
-        "message": f"Account '{db_account.name}' reopened successfully",
-        "account": db_account
+        "message": f"Account '{account.name}' reopened successfully",
+        "account": account
     }
 
 
@@ -936,17 +1021,10 @@ def update_category(
     """
     Update an existing category.
     """
-    db_category = db.query(models.Category).filter(models.Category.id == category_id).first()
-    if not db_category:
-        raise HTTPException(status_code=404, detail="Category not found")
-
-    # Update fields
-    for key, value in category.dict().items():
-        setattr(db_category, key, value)
-
-    db.commit()
-    db.refresh(db_category)
-    return db_category
+    return _update_returning(
+        db, models.Category, schemas.CategoryResponse, category_id,
+        category.model_dump(exclude_unset=True), "Category not found",
+    )
 
 
 @app.put("/payees/{payee_id}", response_model=schemas.PayeeResponse)
@@ -958,17 +1036,10 @@ def update_payee(
     """
     Update an existing payee.
     """
-    db_payee = db.query(models.Payee).filter(models.Payee.id == payee_id).first()
-    if not db_payee:
-        raise HTTPException(status_code=404, detail="Payee not found")
-
-    # Update fields
-    for key, value in payee.dict().items():
-        setattr(db_payee, key, value)
-
-    db.commit()
-    db.refresh(db_payee)
-    return db_payee
+    return _update_returning(
+        db, models.Payee, schemas.PayeeResponse, payee_id,
+        payee.model_dump(exclude_unset=True), "Payee not found",
+    )
 
 
 @app.put("/locations/{location_id}", response_model=schemas.LocationResponse)
@@ -980,17 +1051,10 @@ def update_location(
     """
     Update an existing location.
     """
-    db_location = db.query(models.Location).filter(models.Location.id == location_id).first()
-    if not db_location:
-        raise HTTPException(status_code=404, detail="Location not found")
-
-    # Update fields
-    for key, value in location.dict().items():
-        setattr(db_location, key, value)
-
-    db.commit()
-    db.refresh(db_location)
-    return db_location
+    return _update_returning(
+        db, models.Location, schemas.LocationResponse, location_id,
+        location.model_dump(exclude_unset=True), "Location not found",
+    )
 
 
 @app.put("/projects/{project_id}", response_model=schemas.ProjectResponse)
@@ -1002,17 +1066,10 @@ def update_project(
     """
     Update an existing project.
     """
-    db_project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    if not db_project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    # Update fields
-    for key, value in project.dict().items():
-        setattr(db_project, key, value)
-
-    db.commit()
-    db.refresh(db_project)
-    return db_project
+    return _update_returning(
+        db, models.Project, schemas.ProjectResponse, project_id,
+        project.model_dump(exclude_unset=True), "Project not found",
+    )
 
 
 # ============================================
@@ -1092,10 +1149,119 @@ from typing import List
 from sqlalchemy.orm import joinedload
 from sqlalchemy import or_
 
+def _encode_cursor(when: datetime, transaction_id: int) -> str:
+    """Opaque page key: the (date, id) of the last row a page returned."""
+    return base64.urlsafe_b64encode(f"{when.isoformat()}|{transaction_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        when, transaction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(when), int(transaction_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# The transaction list's columns and joins: the transaction's own columns plus
+# each related entity's name. Built once, as every request only adds filters to
+# it, and a select is immutable, so it is shared safely between requests.
+_TRANSACTION_LIST = select(
+    Transaction.id, Transaction.date, Transaction.amount, Transaction.currency, Transaction.note,
+    Transaction.account_id, Transaction.category_id, Transaction.payee_id,
+    Transaction.location_id, Transaction.project_id, Transaction.split_group_id,
+    Transaction.account_balance_after, Transaction.total_balance_after,
+    Transaction.created_at, Transaction.updated_at,
+    Account.name.label("account_name"),
+    Category.name.label("category_name"),
+    Payee.name.label("payee_name"),
+    Location.name.label("location_name"),
+    Project.name.label("project_name"),
+).outerjoin(Account, Transaction.account_id == Account.id
+).outerjoin(Category, Transaction.category_id == Category.id
+).outerjoin(Payee, Transaction.payee_id == Payee.id
+).outerjoin(Location, Transaction.location_id == Location.id
+).outerjoin(Project, Transaction.project_id == Project.id)
+
+
+def _transactions_query(
+    account_id: Optional[int],
+    category_id: Optional[int],
+    payee_id: Optional[int],
+    location_id: Optional[int],
+    project_id: Optional[int],
+    currency: Optional[str],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    search: Optional[str],
+):
+    """
+    The filtered transaction list, newest first: each row's own columns plus
+    the related entities' names, in the shape of TransactionWithDetails.
+    Run it with ``db.execute``.
+    """
+    T = models.Transaction
+    stmt = _TRANSACTION_LIST
+
+    # Apply filters (same logic as antes)
+    if account_id:
+        stmt = stmt.where(T.account_id == account_id)
+    if category_id:
+        stmt = stmt.where(T.category_id == category_id)
+    if payee_id:
+        stmt = stmt.where(T.payee_id == payee_id)
+    if location_id:
+        stmt = stmt.where(T.location_id == location_id)
+    if project_id:
+        stmt = stmt.where(T.project_id == project_id)
+    if currency:
+        stmt = stmt.where(T.currency == currency)
+    if start_date:
+        stmt = stmt.where(T.date >= datetime.combine(start_date, time.min))
+    if end_date:
+        stmt = stmt.where(T.date <= datetime.combine(end_date, time.max))
+
+    # Search (backend) - only if provided
+    if search and database.search_index and len(search) >= 3 and not any(c in search for c in "%_"):
+        # Substring match on note and payee name through the trigram index: the
+        # search is quoted as one phrase, so it matches anywhere, like LIKE did.
+        phrase = '"' + search.replace('"', '""') + '"'
+        stmt = stmt.where(T.id.in_(
+            text("SELECT rowid FROM transaction_search WHERE transaction_search MATCH :phrase")
+            .bindparams(phrase=phrase)
+        ))
+    elif search:
+        # Use case-insensitive LIKE for payee name and note. Used when the index
+        # can't answer: fewer than 3 characters, LIKE wildcards, or no FTS5.
+        # Note: on SQLite .ilike behaves like LIKE (case-insensitive depending on collation).
+        # Payee is already outer-joined above for payee_name.
+        search_pattern = f"%{search}%"
+        stmt = stmt.where(
+            or_(
+                models.Payee.name.ilike(search_pattern),
+                T.note.ilike(search_pattern)
+            )
+        )
+
+    # Order by date descending (most recent first), then by id to make ordering deterministic
+    return stmt.order_by(T.date.desc(), T.id.desc())
+
+
+# What a page of the transaction list is built from: the rows and the names
+# joined onto them. A write to any of these drops the cached pages.
+_TRANSACTION_LIST_TABLES = ("transactions", "accounts", "categories", "payees", "locations", "projects")
+
+# Pages of the transaction list held at once. Every filter combination and
+# scroll position is its own page, so the oldest are let go.
+_TRANSACTION_PAGES_CACHED = 50
+
+
 @app.get("/transactions", response_model=List[schemas.TransactionWithDetails])
 def get_transactions(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 200,
+    cursor: Optional[str] = None,                # X-Next-Cursor of the previous page
     account_id: Optional[int] = None,
     category_id: Optional[int] = None,
     payee_id: Optional[int] = None,
@@ -1110,92 +1276,83 @@ def get_transactions(
     """
     Retrieve transactions with optional filters. Returns enriched transactions with entity names.
 
-    - Uses joinedload(...) to avoid N+1 queries.
-    - Supports pagination with skip & limit (useful for infinite scroll).
+    - Selects the row's columns and the entity names in one query (outer joins),
+      so no ORM objects are built and no relationship is ever loaded.
+    - Supports pagination with skip & limit (useful for infinite scroll). A full
+      page also sends an X-Next-Cursor header; passing it back as `cursor` seeks
+      straight to the next page on the (date, id) index instead of counting
+      past `skip` rows.
     - `search` filters on payee.name and transaction.note in the backend.
+    - Pages are cached until a transaction or a name on it changes, and carry
+      an ETag, so a repeated request is answered from memory or with a 304.
     """
-    # Base query
-    query = db.query(models.Transaction)
-
-    # Apply filters (same logic as antes)
-    if account_id:
-        query = query.filter(models.Transaction.account_id == account_id)
-    if category_id:
-        query = query.filter(models.Transaction.category_id == category_id)
-    if payee_id:
-        query = query.filter(models.Transaction.payee_id == payee_id)
-    if location_id:
-        query = query.filter(models.Transaction.location_id == location_id)
-    if project_id:
-        query = query.filter(models.Transaction.project_id == project_id)
-    if currency:
-        query = query.filter(models.Transaction.currency == currency)
-    if start_date:
-        query = query.filter(models.Transaction.date >= datetime.combine(start_date, time.min))
-    if end_date:
-        query = query.filter(models.Transaction.date <= datetime.combine(end_date, time.max))
+    T = models.Transaction
 
-    # Search (backend) - only if provided
-    if search:
-        # Use case-insensitive LIKE for payee name and note.
-        # Note: on SQLite .ilike behaves like LIKE (case-insensitive depending on collation).
-        search_pattern = f"%{search}%"
-        # If we want to filter by payee name we should join Payee (left outer join).
-        query = query.outerjoin(models.Payee).filter(
-            or_(
-                models.Payee.name.ilike(search_pattern),
-                models.Transaction.note.ilike(search_pattern)
-            )
+    def build():
+        stmt = _transactions_query(
+            account_id, category_id, payee_id, location_id, project_id,
+            currency, start_date, end_date, search,
         )
 
-    # Avoid N+1: eager-load related objects that you later access (account, category, payee, location, project)
-    query = query.options(
-        joinedload(models.Transaction.account),
-        joinedload(models.Transaction.category),
-        joinedload(models.Transaction.payee),
-        joinedload(models.Transaction.location),
-        joinedload(models.Transaction.project),
+        # Pagination: resume below the cursor's (date, id) if given, else offset/limit
+        if cursor:
+            last_date, last_id = _decode_cursor(cursor)
+            stmt = stmt.where(or_(T.date < last_date, and_(T.date == last_date, T.id < last_id)))
+        else:
+            stmt = stmt.offset(skip)
+        stmt = stmt.limit(limit)
+
+        # Rows are kept as-is: immutable, and the response model reads them by
+        # attribute, like ORM objects
+        return db.execute(stmt).all()
+
+    rows, etag = cached_lookup(
+        db,
+        ("transactions", skip, limit, cursor, account_id, category_id, payee_id,
+         location_id, project_id, currency, start_date, end_date, search),
+        _TRANSACTION_LIST_TABLES, build, keep=_TRANSACTION_PAGES_CACHED,
     )
+    if rows and len(rows) == limit:
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1].date, rows[-1].id)
+    return _lookup_page(request, response, rows, etag)
 
-    # Order by date descending (most recent first), then by id to make ordering deterministic
-    query = query.order_by(models.Transaction.date.desc(), models.Transaction.id.desc())
 
-    # Pagination (offset/limit)
-    transactions = query.offset(skip).limit(limit).all()
+# Rows fetched from the database per round trip while streaming.
+_STREAM_BATCH_SIZE = 200
 
-    # Enrich with entity names (no extra queries because of joinedload)
-    enriched_transactions = []
-    for trans in transactions:
-        # Safety check: skip None transactions (corrupted data)
-        if trans is None:
-            print("WARNING: Found None transaction in get_transactions query")
-            continue
-            
-        trans_dict = {
-            "id": trans.id,
-            "date": trans.date.isoformat() if hasattr(trans.date, "isoformat") else str(trans.date),
-            "amount": float(trans.amount) if trans.amount is not None else None,
-            "currency": trans.currency,
-            "note": trans.note,
-            "account_id": trans.account_id,
-            "category_id": trans.category_id,
-            "payee_id": trans.payee_id,
-            "location_id": trans.location_id,
-            "project_id": trans.project_id,
-            "split_group_id": trans.split_group_id,
-            "account_balance_after": trans.account_balance_after,
-            "total_balance_after": trans.total_balance_after,
-            "created_at": trans.created_at.isoformat() if hasattr(trans.created_at, "isoformat") else trans.created_at,
-            "updated_at": trans.updated_at.isoformat() if hasattr(trans.updated_at, "isoformat") else trans.updated_at,
-            "account_name": trans.account.name if trans.account else None,
-            "category_name": trans.category.name if trans.category else None,
-            "payee_name": trans.payee.name if trans.payee else None,
-            "location_name": trans.location.name if trans.location else None,
-            "project_name": trans.project.name if trans.project else None,
-        }
-        enriched_transactions.append(trans_dict)
 
-    return enriched_transactions
+@app.get("/transactions/stream")
+def stream_transactions(
+    account_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    payee_id: Optional[int] = None,
+    location_id: Optional[int] = None,
+    project_id: Optional[int] = None,
+    currency: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    search: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Every transaction matching the GET /transactions filters, for bulk clients,
+    as newline-delimited JSON (one TransactionWithDetails per line). Rows are
+    serialised and sent as they are read, so memory stays flat however many
+    match, where the paged endpoint builds its whole body before sending.
+    """
+    rows = db.execute(
+        _transactions_query(
+            account_id, category_id, payee_id, location_id, project_id,
+            currency, start_date, end_date, search,
+        ),
+        execution_options={"yield_per": _STREAM_BATCH_SIZE},
+    )
+
+    def lines():
+        for row in rows:
+            yield schemas.TransactionWithDetails.model_validate(row).model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 
@@ -1220,11 +1377,7 @@ def get_transactions_summary(
     """
     base_currency = get_base_currency(db)
 
-    transfer_ids = [
-        r.id for r in db.query(models.Location.id)
-        .filter(models.Location.name.in_(["Transfer In", "Transfer Out"]))
-        .all()
-    ]
+    transfer_ids = get_transfer_location_ids(db)
 
     query = db.query(models.Transaction)
     if account_id:
@@ -1299,79 +1452,73 @@ def get_transfers(
     Supports pagination with skip & limit.
     
     Optimized: Uses O(n) algorithm with hash map instead of O(n²) nested loop.
+    A transfer's two halves share a date, so transfers are read newest first
+    and paired one date at a time, stopping once the requested page is full.
     """
 
-    # Get all transactions with Transfer locations
-    transfer_in_location = db.query(models.Location).filter(
-        models.Location.name == "Transfer In"
-    ).first()
-    transfer_out_location = db.query(models.Location).filter(
-        models.Location.name == "Transfer Out"
-    ).first()
+    # Both transfer locations, cached per database
+    location_ids = get_transfer_locations(db)
+    transfer_in_id = location_ids.get("Transfer In")
+    transfer_out_id = location_ids.get("Transfer Out")
 
-    if not transfer_in_location or not transfer_out_location:
+    if transfer_in_id is None or transfer_out_id is None:
         return []
 
-    # Get all transfer transactions with eager loading
-    transfers = db.query(models.Transaction).options(
-        joinedload(models.Transaction.account)
-    ).filter(
-        or_(
-            models.Transaction.location_id == transfer_in_location.id,
-            models.Transaction.location_id == transfer_out_location.id
-        )
-    ).order_by(models.Transaction.date.desc()).all()
+    # Get all transfer transactions: just the columns the pairing reads, and
+    # the account name, as plain rows rather than ORM objects
+    T = models.Transaction
+    transfers = db.query(
+        T.id, T.date, T.amount, T.currency, T.note, T.account_id, T.location_id,
+        models.Account.name.label("account_name"),
+    ).outerjoin(models.Account, T.account_id == models.Account.id).filter(
+        T.location_id.in_((transfer_in_id, transfer_out_id))
+    ).order_by(T.date.desc()).yield_per(500)
 
-    # O(n) optimization: separate into ins and outs, index by date
-    transfers_in = []
-    transfers_out = []
-    
-    for trans in transfers:
-        if trans.location_id == transfer_in_location.id:
-            transfers_in.append(trans)
-        else:
-            transfers_out.append(trans)
-    
-    # Index transfers_in by date for O(1) lookup
-    transfers_in_by_date = {}
-    for trans in transfers_in:
-        date_key = str(trans.date)
-        if date_key not in transfers_in_by_date:
-            transfers_in_by_date[date_key] = []
-        transfers_in_by_date[date_key].append(trans)
-    
-    # Match transfers - O(n) instead of O(n²)
     grouped_transfers = []
     processed_ids = set()
 
-    for trans_out in transfers_out:
-        if trans_out.id in processed_ids:
-            continue
+    def take(candidates, account_id):
+        """First candidate not yet paired and on a different account."""
+        while candidates and candidates[0].id in processed_ids:
+            candidates.pop(0)
+        return next(
+            (t for t in candidates if t.id not in processed_ids and t.account_id != account_id),
+            None
+        )
 
-        date_key = str(trans_out.date)
-        candidates = transfers_in_by_date.get(date_key, [])
+    for date_key, day in groupby(transfers, key=lambda t: str(t.date)):
+        # Index the day's transfers in twice: by amount for the exact
+        # counterpart, and all together as the fallback when no amount matches.
+        transfers_out = []
+        transfers_in_by_amount = defaultdict(list)
+        transfers_in = []
+
+        for trans in day:
+            if trans.location_id == transfer_in_id:
+                transfers_in_by_amount[round(trans.amount, 2)].append(trans)
+                transfers_in.append(trans)
+            else:
+                transfers_out.append(trans)
 
-        # Find matching transfer_in (same date, different account, not yet processed).
-        # Prefer one with matching amount to disambiguate multiple transfers on the same date.
-        available = [
-            t for t in candidates
-            if t.id not in processed_ids and t.account_id != trans_out.account_id
-        ]
-        matching = next(
-            (t for t in available if abs(trans_out.amount) == t.amount),
-            None
-        ) or (available[0] if available else None)
-        
-        if matching:
+        # Match transfers - one hash lookup per transfer out
+        for trans_out in transfers_out:
+            # Prefer one with matching amount to disambiguate multiple transfers on the same date.
+            matching = take(
+                transfers_in_by_amount.get(round(abs(trans_out.amount), 2), []),
+                trans_out.account_id
+            ) or take(transfers_in, trans_out.account_id)
+
+            if not matching:
+                continue
             grouped_transfers.append({
                 "id": f"transfer_{trans_out.id}_{matching.id}",
                 "date": date_key,
                 "from_account_id": trans_out.account_id,
-                "from_account_name": trans_out.account.name if trans_out.account else None,
+                "from_account_name": trans_out.account_name,
                 "from_amount": abs(trans_out.amount),
                 "from_currency": trans_out.currency,
                 "to_account_id": matching.account_id,
-                "to_account_name": matching.account.name if matching.account else None,
+                "to_account_name": matching.account_name,
                 "to_amount": matching.amount,
                 "to_currency": matching.currency,
                 "note": trans_out.note or matching.note,
@@ -1382,6 +1529,10 @@ def get_transfers(
             processed_ids.add(trans_out.id)
             processed_ids.add(matching.id)
 
+        # Later dates cannot change the pairs already made
+        if len(grouped_transfers) >= skip + limit:
+            break
+
     # Apply pagination to the grouped transfers
     return grouped_transfers[skip:skip + limit]
 
@@ -1434,6 +1585,8 @@ def _recalculate_from_date(db: Session, earliest_date, account_ids: List[int]) -
     matters as soon as several transactions share a timestamp — which is exactly
     what the lines of a split do. Recalculation runs from the trigger forward,
     so the trigger has to be the earliest row that could have changed.
+    With no row left at or after the date, nothing before it moved and only
+    the accounts' closing balances need refreshing.
     """
     trigger = db.query(models.Transaction).filter(
         models.Transaction.date >= earliest_date
@@ -1441,7 +1594,7 @@ def _recalculate_from_date(db: Session, earliest_date, account_ids: List[int]) -
     if trigger:
         recalculate_balances_from_transaction(db, trigger.id, account_ids)
     else:
-        initialise_all_balances(db)
+        refresh_current_balances(db, account_ids)
 
 
 def _serialise_split(db: Session, group_id: int, line_ids: Optional[List[int]] = None) -> dict:
@@ -1644,6 +1797,44 @@ def delete_split_transaction(group_id: int, db: Session = Depends(get_db)):
     return {"message": f"Split transaction deleted ({len(lines)} lines)"}
 
 
+# Declared ahead of /transactions/{transaction_id}, which would otherwise take
+# "batch" as an id and refuse it with a 422.
+@app.get("/transactions/batch", response_model=List[schemas.TransactionWithDetails])
+def get_transactions_batch(
+    ids: str = Query(..., description="Comma-separated list of transaction IDs"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get multiple transactions by IDs in a single request.
+    Much more efficient than fetching one by one.
+    
+    Args:
+        ids: Comma-separated string of transaction IDs (e.g., "1,2,3,4,5")
+    
+    Returns:
+        List of transactions
+    """
+    try:
+        transaction_ids = [int(id.strip()) for id in ids.split(',') if id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid ID format. Use comma-separated integers.")
+    
+    if not transaction_ids:
+        return []
+    
+    # Fetch all transactions in one query: the same column projection as the
+    # transaction list, names outer-joined in, so no ORM objects are built
+    transactions = db.execute(
+        _transactions_query(None, None, None, None, None, None, None, None, None)
+        .where(models.Transaction.id.in_(transaction_ids))
+    ).all()
+    
+    # Rows in the order of the requested IDs, returned as-is: the response
+    # model reads them by attribute and writes the JSON itself
+    tx_map = {tx.id: tx for tx in transactions}
+    return [tx_map[tx_id] for tx_id in transaction_ids if tx_id in tx_map]
+
+
 @app.get("/transactions/{transaction_id}", response_model=schemas.TransactionResponse)
 def get_transaction(
     transaction_id: int,
@@ -1652,9 +1843,9 @@ def get_transaction(
     """
     Retrieve a specific transaction by ID.
     """
-    transaction = db.query(models.Transaction).filter(
-        models.Transaction.id == transaction_id
-    ).first()
+    # The response carries ids only; any relationship touched while serialising
+    # would be a stray lazy load, so make it fail loudly instead.
+    transaction = db.get(models.Transaction, transaction_id, options=[raiseload("*")])
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     return transaction
@@ -1686,10 +1877,16 @@ def check_duplicate_transaction(
         # Parse to datetime to ensure it's valid
         parsed_date = datetime.fromisoformat(date_part)
         
-        # Query for any transaction on the same day, same account, same amount
-        # We use func.date() to compare only the date part, ignoring time
-        exists = db.query(Transaction).filter(
-            func.date(Transaction.date) == parsed_date.date(),
+        # Query for any transaction on the same day, same account, same amount.
+        # The day is the range [day, next day) rather than date() of each row,
+        # so it is read off the (account_id, date, amount) index.
+        day = parsed_date.date()
+        same_day = (
+            Transaction.date >= literal(day.isoformat(), String),
+            Transaction.date < literal((day + timedelta(days=1)).isoformat(), String),
+        )
+        exists = db.query(Transaction.id).filter(
+            *same_day,
             Transaction.amount == duplicate_check.amount,
             Transaction.account_id == duplicate_check.account_id
         ).first() is not None
@@ -1702,7 +1899,7 @@ def check_duplicate_transaction(
             totals = db.query(
                 func.sum(Transaction.amount).label("total")
             ).filter(
-                func.date(Transaction.date) == parsed_date.date(),
+                *same_day,
                 Transaction.account_id == duplicate_check.account_id,
                 Transaction.split_group_id.isnot(None),
             ).group_by(Transaction.split_group_id).all()
@@ -1717,6 +1914,11 @@ def check_duplicate_transaction(
         raise HTTPException(status_code=500, detail=f"Error checking duplicate: {str(e)}")
 
 
+# Keys per duplicate-check query: four bound values each, kept under SQLite's
+# limit on the number of variables in one statement.
+_DUPLICATE_KEYS_PER_QUERY = 200
+
+
 @app.post("/transactions/check-duplicates-batch")
 def check_duplicates_batch(
     transactions: List[schemas.DuplicateCheck],
@@ -1736,66 +1938,51 @@ def check_duplicates_batch(
         if not transactions:
             return {"duplicates": []}
         
-        # Get unique account IDs
-        account_ids = list(set(t.account_id for t in transactions))
-        
-        # Parse all dates and find date range
-        parsed_dates = []
+        # One (day, amount, account) key per transaction
+        keys = []
         for t in transactions:
             date_part = t.date.split('T')[0] if 'T' in t.date else t.date
-            parsed_dates.append(datetime.fromisoformat(date_part).date())
-        
-        min_date = min(parsed_dates)
-        max_date = max(parsed_dates)
-        
-        # Fetch all existing transactions in that date range for those accounts (single query)
-        # Get raw date string from SQLite and the other fields
-        existing = db.query(
-            Transaction.date,
-            Transaction.amount,
-            Transaction.account_id,
-            Transaction.split_group_id
-        ).filter(
-            Transaction.account_id.in_(account_ids),
-            func.date(Transaction.date) >= min_date.isoformat(),
-            func.date(Transaction.date) <= max_date.isoformat()
-        ).all()
-
-        # Build a set of (date_str, amount, account_id) tuples for O(1) lookup
-        # Convert date to YYYY-MM-DD string format for consistent comparison
+            day = datetime.fromisoformat(date_part).date()
+            keys.append((day.isoformat(), round(float(t.amount), 2), t.account_id))
+
+        # Send the distinct keys to the database as a VALUES list and have it
+        # return only those that exist, rather than fetching every transaction
+        # in the batch's date range to match here. Each key is probed through
+        # the (account_id, date) index; a day is the range [day, next day), as
+        # the stored dates carry a time.
+        T = Transaction
+        candidates = [
+            (day, (date.fromisoformat(day) + timedelta(days=1)).isoformat(), amount, account_id)
+            for day, amount, account_id in dict.fromkeys(keys)
+        ]
         existing_set = set()
-        split_totals = {}
-        for tx in existing:
-            # Handle both datetime objects and strings
-            if hasattr(tx.date, 'date'):
-                tx_date_str = tx.date.date().isoformat()
-            elif hasattr(tx.date, 'isoformat'):
-                tx_date_str = tx.date.isoformat()
-            else:
-                # It's already a string, extract date part
-                tx_date_str = str(tx.date).split('T')[0].split(' ')[0]
-
-            existing_set.add((tx_date_str, round(float(tx.amount), 2), tx.account_id))
-
+        for start in range(0, len(candidates), _DUPLICATE_KEYS_PER_QUERY):
+            keyed = sql_values(
+                column("day", String), column("next_day", String),
+                column("amount", Float), column("account_id", Integer),
+                name="candidates",
+            ).data(candidates[start:start + _DUPLICATE_KEYS_PER_QUERY]).cte()
+            same_day = and_(
+                T.account_id == keyed.c.account_id,
+                T.date >= keyed.c.day,
+                T.date < keyed.c.next_day,
+            )
             # A split is one purchase spread over several rows. The bank knows
-            # only the total, so index that too — otherwise re-importing the
+            # only the total, so match that too — otherwise re-importing the
             # statement would duplicate everything the user had split by hand.
-            if tx.split_group_id:
-                key = (tx_date_str, tx.account_id, tx.split_group_id)
-                split_totals[key] = split_totals.get(key, 0.0) + float(tx.amount)
-
-        for (tx_date_str, account_id, _), total in split_totals.items():
-            existing_set.add((tx_date_str, round(total, 2), account_id))
-
-        # Check each transaction against the set
-        results = []
-        for i, t in enumerate(transactions):
-            tx_date_str = parsed_dates[i].isoformat()
-            tx_amount = round(float(t.amount), 2)
-            is_duplicate = (tx_date_str, tx_amount, t.account_id) in existing_set
-            results.append(is_duplicate)
-        
-        return {"duplicates": results}
+            split_total = select(T.split_group_id).where(
+                same_day, T.split_group_id.isnot(None)
+            ).group_by(T.split_group_id).having(
+                func.round(func.sum(T.amount), 2) == keyed.c.amount
+            )
+            existing_set.update(db.execute(
+                select(keyed.c.day, keyed.c.amount, keyed.c.account_id).where(or_(
+                    exists().where(same_day, func.round(T.amount, 2) == keyed.c.amount),
+                    exists(split_total),
+                ))
+            ).tuples())
+
+        return {"duplicates": [key in existing_set for key in keys]}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error checking duplicates: {str(e)}")
@@ -1817,7 +2004,7 @@ def create_transactions_batch(
         Summary of created transactions
     """
     try:
-        created_count = 0
+        rows = []
         errors = []
         
         for i, trans in enumerate(transactions):
@@ -1825,19 +2012,18 @@ def create_transactions_batch(
             if trans.amount is None or trans.date is None or trans.account_id is None:
                 errors.append({"index": i, "error": "Missing required fields"})
                 continue
-            
-            try:
-                db_transaction = models.Transaction(**trans.dict())
-                db.add(db_transaction)
-                created_count += 1
-            except Exception as e:
-                errors.append({"index": i, "error": str(e)})
+            rows.append(trans.dict())
         
-        # Commit all at once
+        # One executemany INSERT rather than an ORM object per row. The schema
+        # has already rounded the amounts; the payees are queued for their
+        # stats recount by hand, as no flush sees these rows.
+        if rows:
+            db.execute(insert(models.Transaction), rows)
+            note_payees_touched(db, {row["payee_id"] for row in rows})
         db.commit()
         
         return {
-            "created": created_count,
+            "created": len(rows),
             "errors": errors,
             "total_submitted": len(transactions)
         }
@@ -1879,171 +2065,21 @@ def create_transaction(
     # 3. RECALCULATE
     if not skip_recalculation:
         try:
-            recalculate_balances_from_transaction(db, db_transaction.id)
-            db.commit()  # Commit after recalculation
-        except Exception as e:
-            # If calculation fails, we MUST rollback the transaction so we don't save bad data
-            db.rollback()
-            print(f"CRITICAL: Calculation failed, rolled back transaction. Error: {e}")
-            raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
-    else:
-        db.commit()
-
-    db.refresh(db_transaction)
-    return db_transaction
-
-
-@app.put("/transactions/{transaction_id}", response_model=schemas.TransactionResponse)
-def update_transaction(
-    transaction_id: int,
-    transaction: schemas.TransactionCreate,
-    db: Session = Depends(get_db)
-):
-    """
-    Update an existing transaction.
-    """
-    db_transaction = db.query(models.Transaction).filter(
-        models.Transaction.id == transaction_id
-    ).first()
-    if not db_transaction:
-        raise HTTPException(status_code=404, detail="Transaction not found")
-
-    # Store old values
-    old_account_id = db_transaction.account_id
-    old_date = db_transaction.date
-
-    # Update transaction fields
-    for key, value in transaction.dict().items():
-        setattr(db_transaction, key, value)
-    db_transaction.updated_at = datetime.utcnow()
-
-    # Do NOT commit here — that happens after the recalculation
-    db.flush()  # Flush so the changes are visible to the following queries
-
-    # Recalculate balances from the EARLIEST date for both accounts
-    affected_account_ids = list(set([old_account_id, transaction.account_id]))
-    earliest_date = min(old_date, db_transaction.date)
-
-    _recalculate_from_date(db, earliest_date, affected_account_ids)
-    db.commit()
-
-    db.refresh(db_transaction)
-    return db_transaction
-
-
-@app.delete("/transactions/{transaction_id}")
-def delete_transaction(
-    transaction_id: int,
-    db: Session = Depends(get_db)
-):
-    """
-    Delete a transaction.
-    """
-    db_transaction = db.query(models.Transaction).filter(
-        models.Transaction.id == transaction_id
-    ).first()
-    if not db_transaction:
-        raise HTTPException(status_code=404, detail="Transaction not found")
-
-    # Store the account ID and date before deleting
-    affected_account_id = db_transaction.account_id
-    transaction_date = db_transaction.date
-    split_group_id = db_transaction.split_group_id
-
-    # Delete the transaction
-    db.delete(db_transaction)
-    db.flush()  # Flush instead of commit to keep the transaction open
-
-    # Deleting one line of a split leaves the rest of the group standing.
-    _reanchor_split(db, split_group_id)
-    db.flush()
-
-    # Find the next transaction after the deleted one to trigger recalculation
-    next_transaction = db.query(models.Transaction).filter(
-        models.Transaction.account_id == affected_account_id,
-        models.Transaction.date >= transaction_date
-    ).order_by(models.Transaction.date.asc(), models.Transaction.id.asc()).first()
-
-    if next_transaction:
-        recalculate_balances_from_transaction(db, next_transaction.id, [affected_account_id])
-    else:
-        # If no transactions remain for this account, reset current_balance
-        account = db.query(models.Account).filter(
-            models.Account.id == affected_account_id
-        ).first()
-        if account:
-            account.current_balance = account.initial_balance
-        # Still need to recalculate total_balance_after for all other transactions
-        recalculate_balances_for_accounts(db, [])
-    db.commit()
-
-    return {"message": "Transaction deleted successfully"}
-
-
-@app.post("/transactions/batch-delete")
-def delete_transactions_batch(
-    transaction_ids: List[int],
-    db: Session = Depends(get_db)
-):
-    """
-    Delete multiple transactions in a single request and recalculate balances ONCE.
-    Much more efficient than deleting one by one.
-    
-    Optimized: Only recalculates affected accounts, not all accounts.
-    
-    Args:
-        transaction_ids: List of transaction IDs to delete
-    
-    Returns:
-        Summary of deleted transactions
-    """
-    if not transaction_ids:
-        return {"deleted": 0, "message": "No transactions to delete"}
-    
-    # Collect affected accounts before deleting
-    affected_accounts = set()
-    affected_splits = set()
-    deleted_count = 0
-    not_found = []
-
-    for tx_id in transaction_ids:
-        tx = db.query(models.Transaction).filter(
-            models.Transaction.id == tx_id
-        ).first()
-
-        if tx:
-            affected_accounts.add(tx.account_id)
-            if tx.split_group_id:
-                affected_splits.add(tx.split_group_id)
-            db.delete(tx)
-            deleted_count += 1
-        else:
-            not_found.append(tx_id)
-
-    # Flush deletions before recalculating
-    db.flush()
-
-    # Re-key any split that lost lines, and dissolve one-line leftovers.
-    for group_id in affected_splits:
-        _reanchor_split(db, group_id)
-    db.flush()
-
-    # Recalculate balances ONLY for affected accounts (not all accounts)
-    if affected_accounts:
-        recalculate_balances_for_accounts(db, list(affected_accounts))
-    
-    db.commit()
-    
-    result = {
-        "deleted": deleted_count,
-        "affected_accounts": list(affected_accounts),
-        "message": f"Successfully deleted {deleted_count} transactions"
-    }
-    
-    if not_found:
-        result["not_found"] = not_found
-    
-    return result
+            recalculate_balances_from_transaction(db, db_transaction.id)
+            # Serialised before the commit expires it: only the balances the
+            # recalculation wrote are read back, not the whole row.
+            created = schemas.TransactionResponse.model_validate(db_transaction)
+            db.commit()  # Commit after recalculation
+        except Exception as e:
+            # If calculation fails, we MUST rollback the transaction so we don't save bad data
+            db.rollback()
+            print(f"CRITICAL: Calculation failed, rolled back transaction. Error: {e}")
+            raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+    else:
+        created = schemas.TransactionResponse.model_validate(db_transaction)
+        db.commit()
+
+    return created
 
 
 from pydantic import BaseModel
@@ -2058,6 +2094,8 @@ class BatchUpdateRequest(BaseModel):
     transactions: List[BatchUpdateItem]
 
 
+# Declared ahead of /transactions/{transaction_id}, which would otherwise take
+# "batch-update" as an id and refuse it with a 422.
 @app.put("/transactions/batch-update")
 def update_transactions_batch(
     request: BatchUpdateRequest,
@@ -2090,9 +2128,12 @@ def update_transactions_batch(
         'payee_id', 'location_id', 'project_id', 'date'
     }
     
-    # Fields that affect balance calculation
-    balance_affecting_fields = {'amount', 'account_id', 'date'}
+    # Fields that affect balance calculation (the currency moves the converted total)
+    balance_affecting_fields = {'amount', 'account_id', 'date', 'currency'}
     needs_balance_recalc = False
+    # Rows whose balances moved, and the earliest date any of them held before
+    rebalanced = []
+    earliest_old_date = None
     
     for item in request.transactions:
         tx = db.query(models.Transaction).filter(
@@ -2106,6 +2147,10 @@ def update_transactions_batch(
         try:
             # Track original account for balance recalculation
             affected_accounts.add(tx.account_id)
+            if balance_affecting_fields & item.updates.keys():
+                rebalanced.append(tx)
+                if earliest_old_date is None or tx.date < earliest_old_date:
+                    earliest_old_date = tx.date
             
             # Apply updates (only allowed fields)
             for field, value in item.updates.items():
@@ -2129,9 +2174,11 @@ def update_transactions_batch(
     # Flush all updates before recalculating
     db.flush()
     
-    # Recalculate balances ONLY for affected accounts (not all accounts)
+    # Recalculate balances ONLY for affected accounts (not all accounts), and
+    # only from the earliest date an edited row held before or holds now
     if affected_accounts and needs_balance_recalc:
-        recalculate_balances_for_accounts(db, list(affected_accounts))
+        earliest_date = min([earliest_old_date] + [tx.date for tx in rebalanced])
+        _recalculate_from_date(db, earliest_date, list(affected_accounts))
     
     db.commit()
     
@@ -2149,52 +2196,150 @@ def update_transactions_batch(
     return result
 
 
-def recalculate_balances_for_accounts(db: Session, account_ids: List[int]):
+@app.put("/transactions/{transaction_id}", response_model=schemas.TransactionResponse)
+def update_transaction(
+    transaction_id: int,
+    transaction: schemas.TransactionCreate,
+    db: Session = Depends(get_db)
+):
     """
-    Recalculate balances for specific accounts and total portfolio balance.
+    Update an existing transaction.
     """
-    from backend.helpers import get_latest_rates, get_base_currency, convert_to_base_currency
+    # By primary key: answered from the identity map when already loaded
+    db_transaction = db.get(models.Transaction, transaction_id)
+    if not db_transaction:
+        raise HTTPException(status_code=404, detail="Transaction not found")
 
-    # Step 1: Recalculate account balances for affected accounts
-    for account_id in account_ids:
-        account = db.query(models.Account).filter(
-            models.Account.id == account_id
-        ).first()
+    # Store old values
+    old_account_id = db_transaction.account_id
+    old_date = db_transaction.date
+    old_balance_fields = (old_account_id, old_date, db_transaction.amount, db_transaction.currency)
 
-        if not account:
-            continue
+    # Update transaction fields
+    for key, value in transaction.dict().items():
+        setattr(db_transaction, key, value)
+    db_transaction.updated_at = datetime.utcnow()
 
-        transactions = db.query(models.Transaction).filter(
-            models.Transaction.account_id == account_id
-        ).order_by(
-            models.Transaction.date.asc(),
-            models.Transaction.id.asc()
-        ).all()
+    # Do NOT commit here — that happens after the recalculation
+    db.flush()  # Flush so the changes are visible to the following queries
 
-        running_balance = float(account.initial_balance) if account.initial_balance else 0.0
+    # Only these fields feed the balances. An edit that leaves them alone (the
+    # note, category, payee...) has nothing to recalculate.
+    if old_balance_fields != (db_transaction.account_id, db_transaction.date,
+                              db_transaction.amount, db_transaction.currency):
+        # Recalculate balances from the EARLIEST date for both accounts
+        affected_account_ids = list(set([old_account_id, transaction.account_id]))
+        earliest_date = min(old_date, db_transaction.date)
 
-        for tx in transactions:
-            if tx.amount is not None:
-                running_balance += float(tx.amount)
-            tx.account_balance_after = round(running_balance, 2)
+        _recalculate_from_date(db, earliest_date, affected_account_ids)
+    db.commit()
 
-        account.current_balance = round(running_balance, 2)
+    db.refresh(db_transaction)
+    return db_transaction
 
-    # Step 2: Recalculate total portfolio balance across all accounts
-    rates = get_latest_rates(db)
-    base_currency = get_base_currency(db)
 
-    all_transactions = db.query(models.Transaction).order_by(
-        models.Transaction.date.asc(), models.Transaction.id.asc()
-    ).all()
+@app.delete("/transactions/{transaction_id}")
+def delete_transaction(
+    transaction_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Delete a transaction.
+    """
+    db_transaction = db.get(models.Transaction, transaction_id)
+    if not db_transaction:
+        raise HTTPException(status_code=404, detail="Transaction not found")
 
-    total_balance = 0.0
-    for tx in all_transactions:
-        converted = convert_to_base_currency(
-            float(tx.amount or 0.0), tx.currency, base_currency, rates
-        )
-        total_balance += converted
-        tx.total_balance_after = round(total_balance, 2)
+    # Store the account ID and date before deleting
+    affected_account_id = db_transaction.account_id
+    transaction_date = db_transaction.date
+    split_group_id = db_transaction.split_group_id
+
+    # Delete the transaction
+    db.delete(db_transaction)
+    db.flush()  # Flush instead of commit to keep the transaction open
+
+    # Deleting one line of a split leaves the rest of the group standing.
+    _reanchor_split(db, split_group_id)
+    db.flush()
+
+    # Recalculate from the deleted row's date forward. The trigger is the next
+    # row in any account, since every later total_balance_after moved too.
+    _recalculate_from_date(db, transaction_date, [affected_account_id])
+    db.commit()
+
+    return {"message": "Transaction deleted successfully"}
+
+
+# Ids bound per IN (...) list, to stay under SQLite's limit on the number of
+# variables in one statement (999 on older builds).
+_IN_LIST_CHUNK = 900
+
+
+@app.post("/transactions/batch-delete")
+def delete_transactions_batch(
+    transaction_ids: List[int],
+    db: Session = Depends(get_db)
+):
+    """
+    Delete multiple transactions in a single request and recalculate balances ONCE.
+    Much more efficient than deleting one by one.
+    
+    Optimized: Only recalculates affected accounts, not all accounts.
+    
+    Args:
+        transaction_ids: List of transaction IDs to delete
+    
+    Returns:
+        Summary of deleted transactions
+    """
+    if not transaction_ids:
+        return {"deleted": 0, "message": "No transactions to delete"}
+    
+    T = models.Transaction
+    ids = list(dict.fromkeys(transaction_ids))
+    chunks = [ids[i:i + _IN_LIST_CHUNK] for i in range(0, len(ids), _IN_LIST_CHUNK)]
+
+    # Collect affected accounts before deleting: one IN query per chunk rather
+    # than a lookup per id
+    rows = []
+    for chunk in chunks:
+        rows.extend(db.query(T.id, T.account_id, T.split_group_id, T.payee_id).filter(
+            T.id.in_(chunk)
+        ).all())
+    found = {row.id for row in rows}
+    not_found = [tx_id for tx_id in transaction_ids if tx_id not in found]
+    affected_accounts = {row.account_id for row in rows}
+    affected_splits = {row.split_group_id for row in rows if row.split_group_id}
+    deleted_count = len(rows)
+
+    # Delete in bulk. Nothing was loaded into the session, so there is nothing to
+    # synchronise; the payees' stats are queued by hand, as no flush sees these.
+    for chunk in chunks:
+        db.query(T).filter(T.id.in_(chunk)).delete(synchronize_session=False)
+    note_payees_touched(db, {row.payee_id for row in rows})
+
+    # Re-key any split that lost lines, and dissolve one-line leftovers.
+    for group_id in affected_splits:
+        _reanchor_split(db, group_id)
+    db.flush()
+
+    # Recalculate balances ONLY for affected accounts (not all accounts)
+    if affected_accounts:
+        recalculate_balances_for_accounts(db, list(affected_accounts))
+    
+    db.commit()
+    
+    result = {
+        "deleted": deleted_count,
+        "affected_accounts": list(affected_accounts),
+        "message": f"Successfully deleted {deleted_count} transactions"
+    }
+    
+    if not_found:
+        result["not_found"] = not_found
+    
+    return result
 
 
 class RecalculateBalancesRequest(BaseModel):
@@ -2217,15 +2362,8 @@ def recalculate_balances_for_accounts_endpoint(
 
     try:
         if request.since:
-            # Incremental: find the earliest transaction at or after `since` and use optimised path
-            since_dt = datetime.fromisoformat(request.since)
-            trigger = db.query(models.Transaction).filter(
-                models.Transaction.account_id.in_(request.account_ids),
-                models.Transaction.date >= since_dt
-            ).order_by(models.Transaction.date.asc(), models.Transaction.id.asc()).first()
-            if trigger:
-                recalculate_balances_from_transaction(db, trigger.id, request.account_ids)
-            # If no transactions found from that date, nothing to recalculate
+            # Incremental: recalculate only from `since` forward
+            _recalculate_from_date(db, datetime.fromisoformat(request.since), request.account_ids)
         else:
             recalculate_balances_for_accounts(db, request.account_ids)
         db.commit()
@@ -2240,69 +2378,6 @@ def recalculate_balances_for_accounts_endpoint(
         raise HTTPException(status_code=500, detail=f"Error recalculating balances: {str(e)}")
 
 
-@app.get("/transactions/batch")
-def get_transactions_batch(
-    ids: str = Query(..., description="Comma-separated list of transaction IDs"),
-    db: Session = Depends(get_db)
-):
-    """
-    Get multiple transactions by IDs in a single request.
-    Much more efficient than fetching one by one.
-    
-    Args:
-        ids: Comma-separated string of transaction IDs (e.g., "1,2,3,4,5")
-    
-    Returns:
-        List of transactions
-    """
-    try:
-        transaction_ids = [int(id.strip()) for id in ids.split(',') if id.strip()]
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid ID format. Use comma-separated integers.")
-    
-    if not transaction_ids:
-        return []
-    
-    # Fetch all transactions in one query with eager loading
-    transactions = db.query(models.Transaction).options(
-        joinedload(models.Transaction.account),
-        joinedload(models.Transaction.category),
-        joinedload(models.Transaction.payee),
-        joinedload(models.Transaction.location),
-        joinedload(models.Transaction.project),
-    ).filter(
-        models.Transaction.id.in_(transaction_ids)
-    ).all()
-    
-    # Build response maintaining order of requested IDs
-    tx_map = {tx.id: tx for tx in transactions}
-    result = []
-    
-    for tx_id in transaction_ids:
-        tx = tx_map.get(tx_id)
-        if tx:
-            result.append({
-                "id": tx.id,
-                "date": tx.date.isoformat() if hasattr(tx.date, "isoformat") else str(tx.date),
-                "amount": float(tx.amount) if tx.amount is not None else None,
-                "currency": tx.currency,
-                "note": tx.note,
-                "account_id": tx.account_id,
-                "category_id": tx.category_id,
-                "payee_id": tx.payee_id,
-                "location_id": tx.location_id,
-                "project_id": tx.project_id,
-                "account_balance_after": tx.account_balance_after,
-                "account_name": tx.account.name if tx.account else None,
-                "category_name": tx.category.name if tx.category else None,
-                "payee_name": tx.payee.name if tx.payee else None,
-                "location_name": tx.location.name if tx.location else None,
-                "project_name": tx.project.name if tx.project else None,
-            })
-    
-    return result
-
-
 # ============================================
 # TRANSFER ENDPOINTS
 # ============================================
@@ -2322,63 +2397,45 @@ def create_transfer(
         skip_recalculation: If True, skip balance recalculation (useful for batch entry)
     """
     # Get or create Transfer In and Transfer Out locations
-    transfer_in_loc = db.query(models.Location).filter(
-        models.Location.name == "Transfer In"
-    ).first()
-    if not transfer_in_loc:
-        transfer_in_loc = models.Location(name="Transfer In")
-        db.add(transfer_in_loc)
-        db.flush()
-
-    transfer_out_loc = db.query(models.Location).filter(
-        models.Location.name == "Transfer Out"
-    ).first()
-    if not transfer_out_loc:
-        transfer_out_loc = models.Location(name="Transfer Out")
-        db.add(transfer_out_loc)
-        db.flush()
+    transfer_in_id, transfer_out_id = ensure_transfer_locations(db)
 
-    # Get accounts to determine currencies
-    from_account = db.query(models.Account).filter(
-        models.Account.id == transfer.from_account_id
-    ).first()
-    to_account = db.query(models.Account).filter(
-        models.Account.id == transfer.to_account_id
-    ).first()
-    if not from_account or not to_account:
+    # Get both accounts' currencies in one query
+    currencies = dict(db.query(models.Account.id, models.Account.currency).filter(
+        models.Account.id.in_((transfer.from_account_id, transfer.to_account_id))
+    ).all())
+    if transfer.from_account_id not in currencies or transfer.to_account_id not in currencies:
         raise HTTPException(status_code=404, detail="Account not found")
 
     # If to_amount not specified, use from_amount
     to_amount = transfer.to_amount if transfer.to_amount else transfer.from_amount
 
-    # Create outgoing transaction
-    transaction_out = models.Transaction(
-        date=transfer.date,
-        amount=-abs(transfer.from_amount),
-        currency=from_account.currency,
-        account_id=transfer.from_account_id,
-        location_id=transfer_out_loc.id,
-        note=transfer.note
-    )
-    db.add(transaction_out)
-    db.flush()
-
-    # Create incoming transaction
-    transaction_in = models.Transaction(
-        date=transfer.date,
-        amount=abs(to_amount),
-        currency=to_account.currency,
-        account_id=transfer.to_account_id,
-        location_id=transfer_in_loc.id,
-        note=transfer.note
-    )
-    db.add(transaction_in)
-    db.flush()
+    # Create the outgoing and incoming transactions with one multi-row INSERT.
+    # Rows are inserted in VALUES order, so the lower id is the outgoing one.
+    out_id, in_id = sorted(db.execute(
+        insert(models.Transaction).values([
+            {
+                "date": transfer.date,
+                "amount": -abs(transfer.from_amount),
+                "currency": currencies[transfer.from_account_id],
+                "account_id": transfer.from_account_id,
+                "location_id": transfer_out_id,
+                "note": transfer.note,
+            },
+            {
+                "date": transfer.date,
+                "amount": abs(to_amount),
+                "currency": currencies[transfer.to_account_id],
+                "account_id": transfer.to_account_id,
+                "location_id": transfer_in_id,
+                "note": transfer.note,
+            },
+        ]).returning(models.Transaction.id)
+    ).scalars())
 
     # Recalculate balances for both accounts (unless skipped for batch mode)
     if not skip_recalculation:
         # Use the earlier transaction ID to start recalculation
-        earlier_transaction_id = min(transaction_out.id, transaction_in.id)
+        earlier_transaction_id = out_id
         recalculate_balances_from_transaction(
             db,
             earlier_transaction_id,
@@ -2387,11 +2444,13 @@ def create_transfer(
     
     db.commit()
 
-    db.refresh(transaction_out)
-    db.refresh(transaction_in)
+    # Both rows back in one SELECT
+    created = {t.id: t for t in db.query(models.Transaction).filter(
+        models.Transaction.id.in_((out_id, in_id))
+    )}
     return {
-        "transfer_out": transaction_out,
-        "transfer_in": transaction_in,
+        "transfer_out": created[out_id],
+        "transfer_in": created[in_id],
         "message": "Transfer created successfully"
     }
 
@@ -2407,30 +2466,35 @@ def get_latest_exchange_rates(db: Session = Depends(get_db)):
     """
     from sqlalchemy import func
 
-    # Get the most recent rate for each currency
-    subquery = db.query(
-        ExchangeRate.currency,
-        func.max(ExchangeRate.date).label('max_date')
-    ).group_by(ExchangeRate.currency).subquery()
+    def build():
+        # Get the most recent rate for each currency
+        subquery = db.query(
+            ExchangeRate.currency,
+            func.max(ExchangeRate.date).label('max_date')
+        ).group_by(ExchangeRate.currency).subquery()
+
+        rates_query = db.query(ExchangeRate.currency, ExchangeRate.rate, ExchangeRate.date).join(
+            subquery,
+            (ExchangeRate.currency == subquery.c.currency) &
+            (ExchangeRate.date == subquery.c.max_date)
+        ).all()
 
-    rates_query = db.query(ExchangeRate).join(
-        subquery,
-        (ExchangeRate.currency == subquery.c.currency) &
-        (ExchangeRate.date == subquery.c.max_date)
-    ).all()
+        rates_dict = {rate.currency: rate.rate for rate in rates_query}
 
-    rates_dict = {rate.currency: rate.rate for rate in rates_query}
+        # Always ensure GBP is 1.0 (base currency)
+        rates_dict['GBP'] = 1.0
 
-    # Always ensure GBP is 1.0 (base currency)
-    rates_dict['GBP'] = 1.0
+        return {
+            "rates": rates_dict,
+            "last_updated": rates_query[0].date.isoformat() if rates_query else None
+        }
+
+    # Rebuilt only once the rates are written (the daily update)
+    latest, _ = cached_lookup(db, "latest_exchange_rates", ("exchange_rates",), build)
 
     from backend.helpers import get_base_currency
 
-    return {
-        "base_currency": get_base_currency(db),
-        "rates": rates_dict,
-        "last_updated": rates_query[0].date.isoformat() if rates_query else None
-    }
+    return {"base_currency": get_base_currency(db), **latest}
 
 
 @app.post("/exchange-rates/update")
@@ -2509,11 +2573,15 @@ def get_dashboard_summary(db: Session = Depends(get_db)):
     """Get summary counts for the dashboard. Balance KPIs are driven by the networth endpoint."""
     base_currency = get_base_currency(db)
 
-    total_transactions = db.query(sql_func.count(Transaction.id)).scalar()
-    total_accounts = db.query(sql_func.count(Account.id)).filter(
-        Account.is_active == 1
-    ).scalar()
-    total_categories = db.query(sql_func.count(Category.id)).scalar()
+    # All three counts in one round trip, kept until one of their tables is written
+    (total_transactions, total_accounts, total_categories), _ = cached_lookup(
+        db, "dashboard_counts", ("transactions", "accounts", "categories"),
+        lambda: tuple(db.execute(select(
+            select(sql_func.count(Transaction.id)).scalar_subquery(),
+            select(sql_func.count(Account.id)).where(Account.is_active == 1).scalar_subquery(),
+            select(sql_func.count(Category.id)).scalar_subquery(),
+        )).one()),
+    )
 
     return {
         "total_transactions": total_transactions,
@@ -2553,11 +2621,18 @@ def get_networth_evolution(
     if date_to:
         filters.append(Transaction.date <= _as_datetime_ceil(date_to))
 
-    # Get all transactions in range
-    query = db.query(Transaction)
+    # Each day's movement per account and currency in range. Only the running
+    # total at the end of a day can reach any period's data point, and one
+    # day's rows share its rate, so they are summed in SQL rather than
+    # loading every transaction.
+    day = sql_func.date(Transaction.date)
+    query = db.query(
+        day.label("date"), Transaction.account_id, Transaction.currency,
+        sql_func.sum(Transaction.amount).label("amount"),
+    )
     if filters:
         query = query.filter(and_(*filters))
-    transactions = query.order_by(Transaction.date).all()
+    transactions = query.group_by(day, Transaction.account_id, Transaction.currency).order_by(day).all()
 
     if not transactions:
         return {
@@ -2577,11 +2652,8 @@ def get_networth_evolution(
     if date_from and _to_date(date_from) < min_trans_date:
         min_trans_date = _to_date(date_from)
 
-    # Get all currencies used
-    currencies_query = db.query(Transaction.currency).distinct()
-    if filters:
-        currencies_query = currencies_query.filter(and_(*filters))
-    currencies = [c[0] for c in currencies_query.all() if c[0]]
+    # Get all currencies used — already on the grouped rows
+    currencies = list(dict.fromkeys(t.currency for t in transactions if t.currency))
 
     # Accounts that never appear in a transaction still hold money, and their
     # currency may not be used anywhere else — without its rate the conversion
@@ -2589,7 +2661,9 @@ def get_networth_evolution(
     untouched_accounts = []
     if not date_from:
         touched_ids = {t.account_id for t in transactions}
-        untouched_q = db.query(Account).filter(Account.is_active == 1)
+        untouched_q = db.query(
+            Account.id, Account.currency, Account.initial_balance
+        ).filter(Account.is_active == 1)
         if touched_ids:
             untouched_q = untouched_q.filter(~Account.id.in_(touched_ids))
         if excluded_ids:
@@ -2617,23 +2691,28 @@ def get_networth_evolution(
     all_balance_points = []
 
     if date_from:
-        accounts_q = db.query(Account).filter(Account.is_active == 1)
+        # Each account with its balance after its last transaction before the
+        # range, all in one query: a correlated lookup per account, each an
+        # index seek on (account_id, date, id)
+        balance_before = select(Transaction.account_balance_after).where(
+            Transaction.account_id == Account.id,
+            Transaction.date < _as_datetime_floor(date_from)
+        ).order_by(Transaction.date.desc(), Transaction.id.desc()).limit(1).correlate(Account).scalar_subquery()
+        accounts_q = db.query(
+            Account.id, Account.currency, Account.initial_balance,
+            balance_before.label("balance_before"),
+        ).filter(Account.is_active == 1)
         if excluded_ids:
             accounts_q = accounts_q.filter(~Account.id.in_(excluded_ids))
-        accounts = accounts_q.all()
+        accounts = accounts_q.order_by(Account.id).all()
 
         baseline_date = _to_date(date_from)
         baseline_rates = historical_rates.get(baseline_date, {'GBP': 1.0})
         total_baseline = 0.0
 
         for acc in accounts:
-            last_tx = db.query(Transaction).filter(
-                Transaction.account_id == acc.id,
-                Transaction.date < _as_datetime_floor(date_from)
-            ).order_by(Transaction.date.desc(), Transaction.id.desc()).first()
-
-            if last_tx and last_tx.account_balance_after is not None:
-                baseline_native = last_tx.account_balance_after
+            if acc.balance_before is not None:
+                baseline_native = acc.balance_before
             else:
                 baseline_native = acc.initial_balance or 0
 
@@ -2653,7 +2732,9 @@ def get_networth_evolution(
     account_initial = {}
     if not date_from:
         account_ids_in_range = set(t.account_id for t in transactions)
-        for acc in db.query(Account).filter(Account.id.in_(account_ids_in_range)).all():
+        for acc in db.query(
+            Account.id, Account.currency, Account.initial_balance
+        ).filter(Account.id.in_(account_ids_in_range)).all():
             if acc.initial_balance:
                 account_initial[acc.id] = (float(acc.initial_balance), acc.currency)
 
@@ -2667,60 +2748,45 @@ def get_networth_evolution(
             acc_rate = opening_rates.get(acc.currency, 1.0)
             account_balances[acc.id] = float(acc.initial_balance) * (opening_base_rate / acc_rate)
 
-    # Process transactions with HISTORICAL rates
-    for trans in transactions:
-        trans_date = _to_date(trans.date)
+    # Process transactions with HISTORICAL rates, a day at a time: the day's
+    # rates are looked up once, and only its closing total becomes a point.
+    # The total is kept as a running sum alongside the per-account balances.
+    total_balance = sum(account_balances.values())
+    for day_key, day_rows in groupby(transactions, key=lambda t: t.date):
+        trans_date = _to_date(day_key)
         rates_for_day = historical_rates.get(trans_date, {'GBP': 1.0})
-
-        trans_rate = rates_for_day.get(trans.currency, 1.0)
         base_rate = rates_for_day.get(base_currency, 1.0)
-        converted_amount = trans.amount * (base_rate / trans_rate)
-
-        if trans.account_id not in account_balances:
-            # Include initial_balance on first appearance (all-time mode only)
-            init_bal = 0.0
-            if trans.account_id in account_initial:
-                init_native, init_currency = account_initial[trans.account_id]
-                init_rate = rates_for_day.get(init_currency, 1.0)
-                init_bal = init_native * (base_rate / init_rate)
-            account_balances[trans.account_id] = init_bal
-        account_balances[trans.account_id] += converted_amount
-
-        total_balance = sum(account_balances.values())
+
+        for trans in day_rows:
+            trans_rate = rates_for_day.get(trans.currency, 1.0)
+            converted_amount = trans.amount * (base_rate / trans_rate)
+
+            if trans.account_id not in account_balances:
+                # Include initial_balance on first appearance (all-time mode only)
+                init_bal = 0.0
+                if trans.account_id in account_initial:
+                    init_native, init_currency = account_initial[trans.account_id]
+                    init_rate = rates_for_day.get(init_currency, 1.0)
+                    init_bal = init_native * (base_rate / init_rate)
+                account_balances[trans.account_id] = init_bal
+                total_balance += init_bal
+            account_balances[trans.account_id] += converted_amount
+            total_balance += converted_amount
+
         all_balance_points.append({
             'date': trans_date,
             'balance': round(total_balance, 2)
         })
 
-    # Aggregate by period
-    aggregated_data = []
+    # Aggregate by period, keeping the last point of each. The points are
+    # already in date order, so each period is one run of them.
     if period == "monthly":
-        monthly_data = {}
-        for point in all_balance_points:
-            if point['date'] is None:
-                continue
-            month_key = point['date'].strftime('%Y-%m')
-            if month_key not in monthly_data or point['date'] >= monthly_data[month_key]['date']:
-                monthly_data[month_key] = point
-        aggregated_data = sorted(monthly_data.values(), key=lambda x: x['date'])
+        period_key = lambda point: (point['date'].year, point['date'].month)
     elif period == "weekly":
-        weekly_data = {}
-        for point in all_balance_points:
-            if point['date'] is None:
-                continue
-            week_start = point['date'] - timedelta(days=point['date'].weekday())
-            week_key = week_start.strftime('%Y-%m-%d')
-            if week_key not in weekly_data or point['date'] >= weekly_data[week_key]['date']:
-                weekly_data[week_key] = point
-        aggregated_data = sorted(weekly_data.values(), key=lambda x: x['date'])
+        period_key = lambda point: point['date'] - timedelta(days=point['date'].weekday())
     else:  # daily — keep last point per day (highest cumulative balance accuracy)
-        daily_data = {}
-        for point in all_balance_points:
-            if point['date'] is None:
-                continue
-            day_key = point['date'].strftime('%Y-%m-%d')
-            daily_data[day_key] = point
-        aggregated_data = sorted(daily_data.values(), key=lambda x: x['date'])
+        period_key = lambda point: point['date']
+    aggregated_data = [list(points)[-1] for _, points in groupby(all_balance_points, key=period_key)]
 
     # Summary statistics
     if aggregated_data:
@@ -2889,11 +2955,7 @@ def _collect_month_expenses(db: Session, start_date, end_date):
     `amount`/`original_amount` are positive and unrounded."""
     base_currency = get_base_currency(db)
 
-    transfer_ids = [
-        r.id for r in db.query(Location.id)
-        .filter(Location.name.in_(["Transfer In", "Transfer Out"]))
-        .all()
-    ]
+    transfer_ids = get_transfer_location_ids(db)
 
     filters = [
         Transaction.date >= _as_datetime_floor(start_date),
@@ -3048,7 +3110,7 @@ def get_yearly_summary(
             Transaction.date <= _as_datetime_ceil(end_date),
             or_(
                 Transaction.location_id.is_(None),
-                Transaction.location.has(Location.name.notin_(["Transfer In", "Transfer Out"]))
+                Transaction.location_id.notin_(get_transfer_location_ids(db))
             )
         )
     ).all()
@@ -3257,11 +3319,7 @@ def get_top_locations(
         filters.append(Transaction.date <= _as_datetime_ceil(date_to))
 
     # Exclude transfer locations
-    transfer_ids = [
-        r.id for r in db.query(Location.id)
-        .filter(Location.name.in_(["Transfer In", "Transfer Out"]))
-        .all()
-    ]
+    transfer_ids = get_transfer_location_ids(db)
     if transfer_ids:
         # A transaction with no location must still count: SQL evaluates
         # "NOT IN" as NULL, not true, when the column itself is NULL.
@@ -3477,10 +3535,7 @@ def get_top_individual_expenses(
 def get_loan_account_ids(db: Session = Depends(get_db)):
     """Return the IDs of accounts detected as loans (not credit cards)."""
     CREDIT_CARD_PAYEE_THRESHOLD = 3
-    transfer_locations = db.query(Location.id).filter(
-        Location.name.in_(["Transfer In", "Transfer Out"])
-    ).all()
-    transfer_location_ids = set(loc.id for loc in transfer_locations)
+    transfer_location_ids = get_transfer_location_ids(db)
 
     declared_loan_accounts = {row[0] for row in db.query(Loan.account_id).all()}
 
@@ -3539,10 +3594,7 @@ def get_loans_summary(db: Session = Depends(get_db)):
     base_rate = rates_dict.get(base_currency, 1.0)
     
     # Get transfer location IDs
-    transfer_locations = db.query(Location.id).filter(
-        Location.name.in_(["Transfer In", "Transfer Out"])
-    ).all()
-    transfer_location_ids = set(loc.id for loc in transfer_locations)
+    transfer_location_ids = get_transfer_location_ids(db)
     
     active_credit_cards = 0
     active_loans = 0
@@ -3681,10 +3733,7 @@ def get_loans_details(
     base_currency = get_base_currency(db)
     
     # Get transfer location IDs
-    transfer_locations = db.query(Location.id).filter(
-        Location.name.in_(["Transfer In", "Transfer Out"])
-    ).all()
-    transfer_location_ids = set(loc.id for loc in transfer_locations)
+    transfer_location_ids = get_transfer_location_ids(db)
     
     result = {
         "credit_cards": [],
@@ -3974,25 +4023,16 @@ def create_loan(payload: schemas.LoanCreate, db: Session = Depends(get_db)):
     # was paid into goes up by the same. Only ever booked for an account opened
     # here — an existing one already carries its own history.
     if created_account and payload.create_disbursement and destination:
-        transfer_out_loc = db.query(Location).filter(Location.name == "Transfer Out").first()
-        if not transfer_out_loc:
-            transfer_out_loc = Location(name="Transfer Out")
-            db.add(transfer_out_loc)
-            db.flush()
-        transfer_in_loc = db.query(Location).filter(Location.name == "Transfer In").first()
-        if not transfer_in_loc:
-            transfer_in_loc = Location(name="Transfer In")
-            db.add(transfer_in_loc)
-            db.flush()
+        transfer_in_id, transfer_out_id = ensure_transfer_locations(db)
 
         note = f"Loan drawdown — {name}"
         out_tx = Transaction(
             date=payload.open_date, amount=-abs(payload.principal), currency=currency,
-            account_id=account.id, location_id=transfer_out_loc.id, note=note,
+            account_id=account.id, location_id=transfer_out_id, note=note,
         )
         in_tx = Transaction(
             date=payload.open_date, amount=abs(payload.principal), currency=destination.currency,
-            account_id=destination.id, location_id=transfer_in_loc.id, note=note,
+            account_id=destination.id, location_id=transfer_in_id, note=note,
         )
         db.add(out_tx)
         db.add(in_tx)
@@ -4112,6 +4152,10 @@ def get_loan_schedule(loan_id: int, db: Session = Depends(get_db)):
 # ADMIN / MAINTENANCE ENDPOINTS
 # ============================================
 
+# Rows fetched and written per round trip when rebuilding every balance.
+_BALANCE_BATCH_SIZE = 10_000
+
+
 @app.post("/admin/initialise-balances")
 def initialise_balances(db: Session = Depends(get_db)):
     """
@@ -4127,39 +4171,37 @@ def initialise_balances(db: Session = Depends(get_db)):
         accounts_map = {acc.id: acc for acc in accounts}
         total_tx_count = 0
         
-        # PHASE 1: Calculate account_balance_after for each account
-        # Also track each account's running balance at each transaction
-        account_running_balances = {}  # account_id -> running_balance
+        # PHASE 1: Calculate account_balance_after for each account.
+        # Rows are streamed as plain columns and written back in batches, so
+        # memory stays bounded by the batch size rather than the ledger size.
+        # Balances are summed in whole pence, which is exact and already at
+        # the two decimals the model's rounding listener (skipped by bulk
+        # writes) would give.
+        running_pence = {
+            acc.id: round(float(acc.initial_balance or 0.0) * 100)
+            for acc in accounts
+        }
+        pending = []
+        rows = db.execute(
+            select(models.Transaction.id, models.Transaction.account_id, models.Transaction.amount)
+            .where(models.Transaction.account_id.in_(list(accounts_map)))
+            .order_by(models.Transaction.account_id, models.Transaction.date, models.Transaction.id)
+            .execution_options(yield_per=_BALANCE_BATCH_SIZE)
+        )
+        for t in rows:
+            if t.amount is None:
+                print(f"WARNING: Transaction ID {t.id} has None or invalid amount. Assuming 0.")
+            running_pence[t.account_id] += round(float(t.amount or 0.0) * 100)
+            pending.append({"id": t.id, "account_balance_after": running_pence[t.account_id] / 100})
+            total_tx_count += 1
+            if len(pending) >= _BALANCE_BATCH_SIZE:
+                db.execute(update(models.Transaction), pending)
+                pending = []
+        if pending:
+            db.execute(update(models.Transaction), pending)
         
-        for account in accounts:
-            print(f"Processing account: {account.name} (ID: {account.id})")
-            account_running_balances[account.id] = float(account.initial_balance) if account.initial_balance is not None else 0.0
-            
-            # Get transactions ordered by date and ID
-            transactions = db.query(models.Transaction).filter(
-                models.Transaction.account_id == account.id
-            ).order_by(models.Transaction.date.asc(), models.Transaction.id.asc()).all()
-            
-            # Calculate running balance
-            running_balance = account_running_balances[account.id]
-            
-            for t in transactions:
-                if t is None:
-                    print("WARNING: Found None transaction in list. Skipping.")
-                    continue
-                
-                if not hasattr(t, 'amount') or t.amount is None:
-                    print(f"WARNING: Transaction ID {t.id} has None or invalid amount. Assuming 0.")
-                    amount = 0.0
-                else:
-                    amount = float(t.amount)
-
-                running_balance += amount
-                t.account_balance_after = running_balance
-                total_tx_count += 1
-            
-            # Update account's current balance
-            account.current_balance = running_balance
+        # Update every account's current balance in one statement
+        write_current_balances(db, {account.id: running_pence[account.id] / 100 for account in accounts})
         
         # PHASE 2: Calculate total_balance_after using HISTORICAL exchange rates
         print("--- CALCULATING TOTAL BALANCE AFTER (historical rates) ---")
@@ -4170,19 +4212,17 @@ def initialise_balances(db: Session = Depends(get_db)):
         # figure in a different currency from the one that produced it.
         BASE_CURRENCY = get_base_currency(db)
 
-        # Get ALL transactions ordered globally by date and ID
-        all_transactions = db.query(models.Transaction).order_by(
-            models.Transaction.date.asc(),
-            models.Transaction.id.asc()
-        ).all()
+        first_date, last_date = db.query(
+            func.min(models.Transaction.date), func.max(models.Transaction.date)
+        ).one()
 
-        if all_transactions:
+        if first_date is not None:
             # Get all currencies used by accounts
             all_currencies = list(set(acc.currency for acc in accounts if acc.currency and acc.currency != BASE_CURRENCY))
 
             # Load historical rates for the full date range
-            min_date = _to_date(all_transactions[0].date)
-            max_date = _to_date(all_transactions[-1].date)
+            min_date = _to_date(first_date)
+            max_date = _to_date(last_date)
             historical_rates = get_rates_bulk(db, all_currencies, min_date, max_date) if all_currencies else {}
 
             # Track converted balances per account (same logic as networth endpoint)
@@ -4191,7 +4231,9 @@ def initialise_balances(db: Session = Depends(get_db)):
             # Seed the accounts that never appear in a transaction: they hold their
             # opening balance throughout, so leaving them out made this running
             # total disagree with the dashboard, which counts them.
-            touched_ids = {t.account_id for t in all_transactions}
+            touched_ids = {
+                account_id for (account_id,) in db.query(models.Transaction.account_id).distinct()
+            }
             opening_rates = historical_rates.get(min_date, {}) or {}
             opening_base_rate = opening_rates.get(BASE_CURRENCY, 1.0)
             for acc in accounts:
@@ -4202,14 +4244,16 @@ def initialise_balances(db: Session = Depends(get_db)):
                     float(acc.initial_balance) * (opening_base_rate / acc_rate)
                 )
 
-            # Initialise with initial_balance converted at first transaction's rate
-            account_initial_added = set()
-
-            # Process transactions in global order
-            for t in all_transactions:
-                if t is None:
-                    continue
-
+            # Process transactions in global order, streamed like phase 1
+            rows = db.execute(
+                select(
+                    models.Transaction.id, models.Transaction.account_id,
+                    models.Transaction.amount, models.Transaction.date,
+                )
+                .order_by(models.Transaction.date, models.Transaction.id)
+                .execution_options(yield_per=_BALANCE_BATCH_SIZE)
+            )
+            for t in rows:
                 trans_date = _to_date(t.date)
                 rates_for_day = historical_rates.get(trans_date, {BASE_CURRENCY: 1.0})
                 base_rate = rates_for_day.get(BASE_CURRENCY, 1.0)
@@ -4231,7 +4275,15 @@ def initialise_balances(db: Session = Depends(get_db)):
                 converted_amount = amount * (base_rate / trans_rate)
 
                 account_converted_balances[t.account_id] += converted_amount
-                t.total_balance_after = round(sum(account_converted_balances.values()), 2)
+                pending.append({
+                    "id": t.id,
+                    "total_balance_after": round(sum(account_converted_balances.values()), 2),
+                })
+                if len(pending) >= _BALANCE_BATCH_SIZE:
+                    db.execute(update(models.Transaction), pending)
+                    pending = []
+            if pending:
+                db.execute(update(models.Transaction), pending)
         
         # Commit all changes
         db.commit()
@@ -4261,14 +4313,17 @@ def recalculate_account_balances(db: Session = Depends(get_db)):
     try:
         # Get all accounts
         accounts = db.query(Account).all()
-        for account in accounts:
-            # Calculate balance from initial_balance + sum of all transactions
-            total_transactions = db.query(func.sum(Transaction.amount)).filter(
-                Transaction.account_id == account.id
-            ).scalar() or 0
+        transaction_sums = dict(
+            db.query(Transaction.account_id, func.sum(Transaction.amount))
+            .group_by(Transaction.account_id).all()
+        )
 
-            # Update current_balance
-            account.current_balance = account.initial_balance + total_transactions
+        # current_balance = initial_balance + sum of all transactions, for every
+        # account in one UPDATE
+        write_current_balances(db, {
+            account.id: round(account.initial_balance + (transaction_sums.get(account.id) or 0), 2)
+            for account in accounts
+        })
 
         db.commit()
 
@@ -4510,6 +4565,7 @@ async def restore_database(file: UploadFile = File(...)):
         if eng is not None:
             eng.dispose()
         os.replace(to_install, live)
+        clear_caches()   # same engine, different data: nothing cached still holds
         for suffix in ("-wal", "-shm"):
             p = live + suffix
             if os.path.exists(p):
@@ -4517,6 +4573,7 @@ async def restore_database(file: UploadFile = File(...)):
                 except OSError: pass
         if eng is not None:
             models.Base.metadata.create_all(bind=eng)  # add any tables a newer build expects
+            database.ensure_search_index(eng)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Restore failed during swap: {e}")
     finally:
@@ -5328,11 +5385,7 @@ def detect_recurring_expenses(
     )
 
     # Get transfer location IDs to exclude
-    transfer_ids = [
-        r.id for r in db.query(Location.id)
-        .filter(Location.name.in_(["Transfer In", "Transfer Out"]))
-        .all()
-    ]
+    transfer_ids = get_transfer_location_ids(db)
 
     # Get transactions from recent months only
     filters = [
@@ -5424,14 +5477,15 @@ def detect_recurring_expenses(
     # PART 2: Detect recurring TRANSFERS (debt payments)
     # ============================================
 
-    # Get Transfer Out location ID
-    transfer_out_loc = db.query(Location).filter(Location.name == "Transfer Out").first()
-    transfer_in_loc = db.query(Location).filter(Location.name == "Transfer In").first()
+    # Get Transfer Out / Transfer In location IDs
+    transfer_locations = get_transfer_locations(db)
+    transfer_out_id = transfer_locations.get("Transfer Out")
+    transfer_in_id = transfer_locations.get("Transfer In")
 
-    if transfer_out_loc and transfer_in_loc:
+    if transfer_out_id and transfer_in_id:
         # Get all Transfer Out transactions from recent months
         transfer_filters = [
-            Transaction.location_id == transfer_out_loc.id,
+            Transaction.location_id == transfer_out_id,
             Transaction.amount < 0,
             Transaction.date >= datetime.combine(cutoff_date, time.min)
         ]
@@ -5445,7 +5499,7 @@ def detect_recurring_expenses(
 
             # Find matching Transfer In on the same day with similar amount
             matching_in = db.query(Transaction).filter(
-                Transaction.location_id == transfer_in_loc.id,
+                Transaction.location_id == transfer_in_id,
                 Transaction.amount > 0,
                 func.date(Transaction.date) == tx_date,
                 Transaction.amount >= abs(tx_out.amount) * 0.99,
@@ -5543,8 +5597,7 @@ def create_recurring_expense(
         is_active=1
     )
     db.add(new_recurring)
-    db.commit()
-    db.refresh(new_recurring)
+    db.flush()  # assigns the id the history record points at
 
     # Create initial history record for this amount
     today = date.today()
@@ -5557,9 +5610,10 @@ def create_recurring_expense(
         created_at=datetime.utcnow()
     )
     db.add(history)
-    db.commit()
+    db.flush()
 
-    return {
+    # Built before the commit, while nothing is expired, so no reload is needed
+    response = {
         "id": new_recurring.id,
         "name": new_recurring.name,
         "payee_id": new_recurring.payee_id,
@@ -5573,6 +5627,8 @@ def create_recurring_expense(
         "start_month": new_recurring.start_month,
         "is_active": new_recurring.is_active
     }
+    db.commit()
+    return response
 
 
 @app.put("/recurring/{recurring_id}")
@@ -5615,10 +5671,9 @@ def update_recurring_expense(
     recurring.frequency = data.frequency or "monthly"
     recurring.start_month = data.start_month
 
-    db.commit()
-    db.refresh(recurring)
+    db.flush()
 
-    return {
+    response = {
         "id": recurring.id,
         "name": recurring.name,
         "payee_id": recurring.payee_id,
@@ -5632,6 +5687,8 @@ def update_recurring_expense(
         "start_month": recurring.start_month,
         "is_active": recurring.is_active
     }
+    db.commit()
+    return response
 
 
 @app.delete("/recurring/{recurring_id}")
@@ -5660,14 +5717,15 @@ def toggle_recurring_expense(
         raise HTTPException(status_code=404, detail="Recurring expense not found")
 
     recurring.is_active = 0 if recurring.is_active == 1 else 1
-    db.commit()
-    db.refresh(recurring)
+    db.flush()
 
-    return {
+    response = {
         "id": recurring.id,
         "name": recurring.name,
         "is_active": recurring.is_active
     }
+    db.commit()
+    return response
 
 
 @app.patch("/recurring/{recurring_id}/toggle-paid/{year_month}")
@@ -5746,10 +5804,9 @@ def create_planned_expense(
         is_paid=0
     )
     db.add(new_planned)
-    db.commit()
-    db.refresh(new_planned)
+    db.flush()
 
-    return {
+    response = {
         "id": new_planned.id,
         "year_month": new_planned.year_month,
         "name": new_planned.name,
@@ -5759,6 +5816,8 @@ def create_planned_expense(
         "category_name": new_planned.category.name if new_planned.category else None,
         "is_paid": new_planned.is_paid
     }
+    db.commit()
+    return response
 
 
 @app.put("/planned/{planned_id}")
@@ -5777,10 +5836,9 @@ def update_planned_expense(
     planned.currency = data.currency
     planned.category_id = data.category_id
 
-    db.commit()
-    db.refresh(planned)
+    db.flush()
 
-    return {
+    response = {
         "id": planned.id,
         "year_month": planned.year_month,
         "name": planned.name,
@@ -5790,6 +5848,8 @@ def update_planned_expense(
         "category_name": planned.category.name if planned.category else None,
         "is_paid": planned.is_paid
     }
+    db.commit()
+    return response
 
 
 @app.delete("/planned/{planned_id}")
@@ -5818,14 +5878,15 @@ def toggle_planned_expense_paid(
         raise HTTPException(status_code=404, detail="Planned expense not found")
 
     planned.is_paid = 0 if planned.is_paid == 1 else 1
-    db.commit()
-    db.refresh(planned)
+    db.flush()
 
-    return {
+    response = {
         "id": planned.id,
         "name": planned.name,
         "is_paid": planned.is_paid
     }
+    db.commit()
+    return response
 
 # ============================================
 # SERVE FRONTEND (must be last)
@@ -21,8 +21,7 @@ import time
 from datetime import date, datetime, timedelta
 
 from backend import database
-from backend.helpers import initialise_all_balances
-from backend.models import Payee, Transaction
+from backend.helpers import initialise_all_balances, refresh_payee_stats
 from backend import backup as db_backup
 from backend import settings_store
 
@@ -37,28 +36,7 @@ _state_lock = threading.Lock()
 def recalculate_all_payee_stats(db) -> int:
     """Recompute each payee's most-common category/location/project. Returns count.
     Shared by the maintenance job and the /payees/recalculate-all-stats endpoint."""
-    payees = db.query(Payee).all()
-    for payee in payees:
-        transactions = db.query(Transaction).filter(Transaction.payee_id == payee.id).all()
-        if not transactions:
-            payee.most_common_category_id = None
-            payee.most_common_location_id = None
-            payee.most_common_project_id = None
-            payee.updated_at = datetime.utcnow()
-            continue
-        category_counts, location_counts, project_counts = {}, {}, {}
-        for t in transactions:
-            if t.category_id:
-                category_counts[t.category_id] = category_counts.get(t.category_id, 0) + 1
-            if t.location_id:
-                location_counts[t.location_id] = location_counts.get(t.location_id, 0) + 1
-            if t.project_id:
-                project_counts[t.project_id] = project_counts.get(t.project_id, 0) + 1
-        payee.most_common_category_id = max(category_counts, key=category_counts.get) if category_counts else None
-        payee.most_common_location_id = max(location_counts, key=location_counts.get) if location_counts else None
-        payee.most_common_project_id = max(project_counts, key=project_counts.get) if project_counts else None
-        payee.updated_at = datetime.utcnow()
-    return len(payees)
+    return refresh_payee_stats(db)
 
 
 def _update_rates_if_needed() -> bool:
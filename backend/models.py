@@ -120,6 +120,9 @@ class Transaction(Base):
         Index('idx_transaction_category_date', 'category_id', 'date'),
         Index('idx_transaction_payee_date', 'payee_id', 'date'),
         
+        # Duplicate checks: an account's rows on a day, amounts read off the index
+        Index('idx_transaction_account_date_amount', 'account_id', 'date', 'amount'),
+
         # Critical index for balance recalculation (account + date ASC + id ASC)
         Index('idx_transaction_account_date_id_asc', 'account_id', 'date', 'id'),
         
@@ -34,6 +34,21 @@ class AccountResponse(AccountBase):
         from_attributes = True
 
 
+class AccountWithBalance(BaseModel):
+    """Account with its balance as of its most recent transaction."""
+    id: int
+    name: str
+    type: Optional[str] = None
+    currency: Optional[str] = None
+    initial_balance: Optional[float] = None
+    current_balance: Optional[float] = None
+    is_active: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 # --- Category schemas ---
 
 class CategoryBase(BaseModel):